@@ -0,0 +1,250 @@
+# Plays the economy without a screen to see how the balance works out: how
+# long each portal level takes, how resources build up and how much of what is
+# gathered gets spent. Every run is one strategy on one world, played tick by
+# tick by the same Simulation the game runs, and runs are spread over a process
+# pool so a sweep takes about as long as one run per core.
+#
+#   python balance.py --runs 16 --strategy greedy --strategy opening.json --json out.json --csv out.csv
+#
+# A strategy is 'greedy' or a JSON file with the list of things to buy in
+# order, "Green Worker Slime" or "Green Worker Slime@Wood" to have it gather a
+# particular resource. Each step waits until it can be bought.
+
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import economy
+import world
+from simulation import Simulation, GathererModel, TICK_RATE
+
+WORLD_RADIUS = 8  # Chunks out from the portal the deposits are taken from, covers every resource band
+PORTAL_RADIUS = 3  # Tiles under the portal, deposits there can't be clicked on in the game
+
+# Shop rewards are just names here, buy() works out what to do with them
+REWARDS = {name: name for name in [*economy.GATHERERS, *economy.TASK_MASTERS, *economy.LEVELS]}
+
+def find_deposits(seed, radius = WORLD_RADIUS):
+    # [(distance, deposit id, resource, tile)] of the world's deposits, nearest first.
+    # Gatherers are sent to the deposit's tile nearest the portal. The portal's chunk
+    # is left empty like in the game
+    resource_ids = {name: i + 1 for i, name in enumerate(economy.RESOURCES)}
+    mappings = economy.resource_mappings(random.Random(seed), resource_ids)
+    coords = [(x, y) for x in range(-radius, radius + 1) for y in range(-radius, radius + 1) if (x, y) != world.PORTAL_CHUNK]
+    chunks = world.generate_chunks(seed, coords, world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, mappings)
+    deposits = []
+    for (chunk_x, chunk_y), chunk in chunks.items():
+        for i, (x, y, width, height, resource_id) in enumerate(chunk.deposits):
+            tile = (min(max(0, x), x + width - 1), min(max(0, y), y + height - 1))
+            if max(abs(tile[0]), abs(tile[1])) > PORTAL_RADIUS:
+                deposits.append((math.hypot(*tile), (chunk_x, chunk_y, i), economy.RESOURCES[resource_id - 1], tile))
+    deposits.sort()
+    return deposits
+
+class Run:
+    # One playthrough: the simulation, the portal's shop and a record of what was bought when
+
+    def __init__(self, seed, deposits, clicks_per_second):
+        self.seed = seed
+        self.simulation = Simulation(economy.RESOURCES, seed = seed)
+        self.quantities = self.simulation.resource_quantities
+        self.recipes = economy.make_recipes(REWARDS)
+        self.level = 0
+        self.free = list(deposits)  # Deposits nobody is assigned to, nearest first
+        self.workers = Counter()  # Gatherers on each resource
+        self.task_masters = 0
+        self.clicks_per_second = clicks_per_second
+        self.clicked = 0
+        self.spent = dict.fromkeys(economy.RESOURCES, 0)
+        self.level_times = {}
+        self.purchases = []
+        self.curve = []
+
+    @property
+    def shop(self):
+        return {name: recipe for name, recipe in self.recipes[self.level].items() if recipe['quantity'] > 0}
+
+    def can_buy(self, name):
+        recipe = self.shop.get(name)
+        return recipe is not None and economy.can_buy(self.quantities, recipe['cost']) and (name not in economy.GATHERERS or self.deposit_for(name) is not None)
+
+    def deposit_for(self, name, resource = None):
+        # The free deposit a new gatherer of that kind would be sent to, or None
+        resources = [resource] if resource else economy.GATHERERS[name]['resources_gatherable']
+        nearest = {}
+        for deposit in self.free:
+            if deposit[2] in resources and deposit[2] not in nearest:
+                nearest[deposit[2]] = deposit
+        if not nearest:
+            return None
+        need = self.need()
+        return max(nearest.values(), key = lambda deposit: need.get(deposit[2], 0) / (1 + self.workers[deposit[2]]))
+
+    def need(self):
+        # How much more of each resource the next upgrade takes, with Essence always wanted for summons
+        need = Counter()
+        upgrade = self.shop.get('Upgrade Portal')
+        if upgrade:
+            for resource, amount in economy.price(upgrade['cost']).items():
+                need[resource] += max(amount - self.quantities[resource], 0)
+        summons = [economy.price(recipe['cost']).get('Essence', 0) for name, recipe in self.shop.items() if name != 'Upgrade Portal']
+        need['Essence'] += min(summons, default = 0) + 1
+        return need
+
+    def buy(self, name, resource = None):
+        recipe = self.recipes[self.level][name]
+        for paid, amount in economy.price(recipe['cost']).items():
+            self.spent[paid] += amount
+        economy.buy(self.quantities, recipe)
+        self.purchases.append((self.simulation.time, name))
+        if name == 'Upgrade Portal':
+            self.level += 1
+            economy.carry_over(self.recipes, self.level)
+            self.level_times[self.level] = self.simulation.time  # Not by reward, several upgrades share one
+        elif name in economy.GATHERERS:
+            deposit = self.deposit_for(name, resource)
+            self.free.remove(deposit)
+            gatherer = GathererModel(name, **economy.GATHERERS[name])
+            gatherer.position = (0,3)
+            self.simulation.add_gatherer(gatherer)
+            gatherer.set_assignment([deposit[1], None, deposit[2], deposit[3]])
+            self.simulation.assignments[deposit[1]] = gatherer
+            self.workers[deposit[2]] += 1
+        else:
+            # Where a task master wanders doesn't matter to the economy, only its bonus
+            self.simulation.modifiers.apply(economy.TASK_MASTERS[name]['effect'])
+            self.task_masters += 1
+
+    def second(self):
+        # Click on Essence for a second while the simulation runs
+        self.quantities['Essence'] += self.clicks_per_second
+        self.clicked += self.clicks_per_second
+        for tick in range(TICK_RATE):
+            self.simulation.tick()
+
+    def sample(self):
+        self.curve.append({'time': self.simulation.time, 'level': self.level, 'gatherers': len(self.simulation.gatherers),
+                           'task_masters': self.task_masters, **self.quantities})
+
+    def report(self):
+        gathered = {resource: self.quantities[resource] + self.spent[resource] for resource in economy.RESOURCES}
+        total = sum(gathered.values())
+        return {'seed': self.seed, 'level': self.level, 'level_times': self.level_times,
+                'resources': dict(self.quantities), 'spent': self.spent, 'gathered': gathered, 'clicked': self.clicked,
+                'efficiency': sum(self.spent.values()) / total if total else 0,
+                'purchases': self.purchases, 'curve': self.curve}
+
+def greedy(run):
+    # Upgrade as soon as possible, otherwise summon whatever is cheapest until nothing more can be bought
+    while True:
+        if run.can_buy('Upgrade Portal'):
+            run.buy('Upgrade Portal')
+            continue
+        options = [name for name in run.shop if name != 'Upgrade Portal' and run.can_buy(name)]
+        if not options:
+            return
+        run.buy(min(options, key = lambda name: sum(economy.price(run.shop[name]['cost']).values())))
+
+def scripted(steps):
+    steps = list(steps)
+    def play(run):
+        while steps:
+            name, _, resource = steps[0].partition('@')
+            if not run.can_buy(name) or (resource and run.deposit_for(name, resource) is None):
+                return
+            run.buy(name, resource or None)
+            steps.pop(0)
+    return play
+
+def play(job):
+    # Runs in the pool: one strategy on one world for the given number of seconds
+    strategy, steps, seed, seconds, sample_every, clicks_per_second = job
+    run = Run(seed, find_deposits(seed), clicks_per_second)
+    decide = greedy if steps is None else scripted(steps)
+    run.sample()
+    for second in range(1, seconds + 1):
+        decide(run)
+        run.second()
+        if second % sample_every == 0:
+            run.sample()
+    report = run.report()
+    report['strategy'] = strategy
+    return report
+
+def load_strategy(strategy):
+    # (name, steps), steps is None for greedy
+    if strategy == 'greedy':
+        return strategy, None
+    with open(strategy) as file:
+        return os.path.splitext(os.path.basename(strategy))[0], json.load(file)
+
+def summarize(reports):
+    # Per strategy, the spread of times to each level over its runs and how many runs got there
+    summary = {}
+    for report in reports:
+        entry = summary.setdefault(report['strategy'], {'runs': 0, 'levels': {}, 'efficiency': []})
+        entry['runs'] += 1
+        entry['efficiency'].append(report['efficiency'])
+        for level, seconds in report['level_times'].items():
+            entry['levels'].setdefault(level, []).append(seconds)
+    for entry in summary.values():
+        entry['efficiency'] = statistics.mean(entry['efficiency'])
+        entry['levels'] = {level: {'reached': len(times), 'median': statistics.median(times), 'min': min(times), 'max': max(times)}
+                           for level, times in sorted(entry['levels'].items())}
+    return summary
+
+def write_csv(path, reports):
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['strategy', 'seed', 'time', 'level', 'gatherers', 'task_masters', *economy.RESOURCES])
+        for report in reports:
+            for sample in report['curve']:
+                writer.writerow([report['strategy'], report['seed'], sample['time'], sample['level'], sample['gatherers'], sample['task_masters'],
+                                 *(sample[resource] for resource in economy.RESOURCES)])
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Play the economy headless and report how the balance works out')
+    parser.add_argument('--strategy', action = 'append', help = "'greedy' (the default) or a JSON list of summons to buy in order, can be given more than once")
+    parser.add_argument('--runs', type = int, default = 8, help = 'Runs of each strategy, each on its own world')
+    parser.add_argument('--seed', type = int, default = world.SEED, help = 'World seed of the first run, the rest count up from it')
+    parser.add_argument('--minutes', type = float, default = 30, help = 'Simulated minutes per run')
+    parser.add_argument('--sample-every', type = int, default = 10, help = 'Seconds between resource curve samples')
+    parser.add_argument('--clicks-per-second', type = int, default = 2, help = 'Essence gathered by hand every second')
+    parser.add_argument('--workers', type = int, default = os.cpu_count(), help = 'Processes to play runs in')
+    parser.add_argument('--json', help = 'Write every run and the summary here')
+    parser.add_argument('--csv', help = 'Write the resource curves here')
+    args = parser.parse_args(argv)
+
+    strategies = [load_strategy(strategy) for strategy in args.strategy or ['greedy']]
+    jobs = [(name, steps, args.seed + run, int(args.minutes * 60), args.sample_every, args.clicks_per_second)
+            for name, steps in strategies for run in range(args.runs)]
+
+    start = time.perf_counter()
+    if args.workers > 1:
+        with ProcessPoolExecutor(args.workers) as pool:
+            reports = list(pool.map(play, jobs))
+    else:
+        reports = [play(job) for job in jobs]
+    elapsed = time.perf_counter() - start
+    print(f'{len(jobs)} runs in {elapsed:.1f}s on {args.workers} workers, {len(jobs) / elapsed:.2f} runs/s', file = sys.stderr)
+
+    summary = summarize(reports)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'summary': summary, 'runs': reports}, file)
+    if args.csv:
+        write_csv(args.csv, reports)
+    for strategy, entry in summary.items():
+        levels = ', '.join(f"level {level} {times['median']:.0f}s ({times['reached']}/{entry['runs']})" for level, times in entry['levels'].items())
+        print(f"{strategy}: {levels or 'no upgrades'}, {entry['efficiency']:.0%} of gathered spent")
+
+if __name__ == '__main__':
+    main()
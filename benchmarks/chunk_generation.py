@@ -0,0 +1,48 @@
+# Chunks generated per second, by world.generate_chunks in one batch and a
+# chunk at a time the way a lone generate_chunk call does.
+#
+#   python benchmarks/chunk_generation.py --radius 32
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import economy
+import world
+
+def mappings(seed):
+    resource_ids = {name: i + 1 for i, name in enumerate(economy.RESOURCES)}
+    return economy.resource_mappings(random.Random(seed), resource_ids)
+
+def best(function, repeat):
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Measure chunk generation throughput')
+    parser.add_argument('--radius', type = int, default = 32, help = 'Chunks out from the origin, the block is (2r+1)^2 chunks')
+    parser.add_argument('--repeat', type = int, default = 3, help = 'Runs of each, the fastest is reported')
+    parser.add_argument('--seed', type = int, default = world.SEED)
+    args = parser.parse_args(argv)
+
+    settings = (world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, mappings(args.seed))
+    coords = [(x, y) for x in range(-args.radius, args.radius + 1) for y in range(-args.radius, args.radius + 1)]
+    runs = {
+        'one batch': lambda: world.generate_chunks(args.seed, coords, *settings),
+        'chunk by chunk': lambda: [world.generate_chunk(args.seed, x, y, *settings) for x, y in coords],
+    }
+
+    print(f'{len(coords)} chunks of {world.CHUNK_SIZE}x{world.CHUNK_SIZE}')
+    for name, run in runs.items():
+        print(f'{name:>15}: {len(coords) / best(run, args.repeat) / 1000:6.1f}k chunks/s')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+# Cost of a simulation tick against the number of working gatherers, from a
+# hundred slimes to the tens of thousands the GathererEngine is meant for.
+# Gatherers are spread over deposit tiles around the portal and left to walk,
+# gather and drop off for a whole round trip of the slowest one before the
+# ticks are timed, so the timing sees the gathers and drop-offs of a colony
+# that has settled in rather than everyone on their first walk out.
+#
+#   python benchmarks/gatherer_engine.py --gatherers 100 1000 10000 50000
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import economy
+from simulation import Simulation, GathererModel
+
+def build(count, seed, radius):
+    simulation = Simulation(economy.RESOURCES, seed = seed)
+    rng = random.Random(seed)
+    stats = economy.GATHERERS['Green Worker Slime']
+    for i in range(count):
+        gatherer = GathererModel('Green Worker Slime', **stats)
+        gatherer.position = (0,3)
+        simulation.add_gatherer(gatherer)
+        tile = (rng.randint(-radius, radius), rng.randint(-radius, radius))
+        gatherer.set_assignment([(0, 0, i), None, rng.choice(['Essence', 'Wood']), tile])
+    return simulation
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Measure simulation ticks against the number of gatherers')
+    parser.add_argument('--gatherers', type = int, nargs = '+', default = [100, 1000, 10000, 50000])
+    parser.add_argument('--radius', type = int, default = 10, help = 'Tiles out from the portal deposits are placed')
+    parser.add_argument('--ticks', type = int, default = 1000, help = 'Ticks timed at each count')
+    parser.add_argument('--seed', type = int, default = 1)
+    args = parser.parse_args(argv)
+
+    print(f'{"gatherers":>10} {"warmup":>7} {"per tick":>10} {"per gatherer":>13} {"delivered/tick":>15}')
+    for count in args.gatherers:
+        simulation = build(count, args.seed, args.radius)
+        warmup = int(simulation.gatherer_engine.cycles()[0].max()) + 1
+        for tick in range(warmup):
+            simulation.tick()
+        before = sum(simulation.resource_quantities.values())
+        start = time.perf_counter()
+        for tick in range(args.ticks):
+            simulation.tick()
+        per_tick = (time.perf_counter() - start) / args.ticks
+        delivered = (sum(simulation.resource_quantities.values()) - before) / args.ticks
+        print(f'{count:>10,} {warmup:>7} {per_tick * 1000:>7.3f} ms {per_tick / count * 1e6:>10.3f} us {delivered:>15.1f}')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# Time to draw the world with Game.render_grid as more and more chunks are
+# loaded, it should stay flat since only the chunks on screen are drawn.
+# Runs headless with the music off, explored chunks go to a temporary directory.
+#
+#   python benchmarks/render_grid.py --chunks 4096 16384 65536
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import world
+from main import Game
+
+def make_game(directory):
+    os.chdir(ROOT)  # Sprites and fonts are loaded relative to the game's directory
+    pygame.mixer.music.load = lambda *args, **kwargs: None
+    pygame.mixer.music.play = lambda *args, **kwargs: None
+    game = Game()
+    game.state = 'game'
+    game.chunk_streamer.shutdown()
+    game.region_store.close()
+    game.region_store = world.RegionStore(directory, game.CHUNK_SIZE)
+    return game
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = 'Measure render_grid against the number of loaded chunks')
+    parser.add_argument('--chunks', type = int, nargs = '+', default = [4096, 16384, 65536], help = 'Loaded chunk counts to measure at, rounded to a square')
+    parser.add_argument('--frames', type = int, default = 50, help = 'Frames averaged at each count')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        game = make_game(directory)
+        surface = pygame.Surface(game.screen.get_size())
+        print(f'{"loaded chunks":>14} {"first frame":>12} {"per frame":>10}')
+        for count in args.chunks:
+            side = int(count ** 0.5) // 2
+            coords = [(x, y) for x in range(-side, side) for y in range(-side, side) if (x, y) not in game.chunks]
+            game.chunks.update(game.generate_chunks(coords))
+            game.chunk_surfaces = type(game.chunk_surfaces)(game.rasterize_chunk, game.CHUNK_SURFACE_BUDGET)
+
+            start = time.perf_counter()
+            game.render_grid(surface)
+            first = time.perf_counter() - start
+            start = time.perf_counter()
+            for frame in range(args.frames):
+                game.render_grid(surface)
+            per_frame = (time.perf_counter() - start) / args.frames
+            print(f'{len(game.chunks):>14,} {first * 1000:>9.2f} ms {per_frame * 1000:>7.2f} ms')
+        game.region_store.close()
+    pygame.quit()
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import pygame
 
+from caches import text_cache
 from user_interface import render_text_outline
 
 class ButtonGroup:
@@ -30,7 +31,7 @@ class Button:
 
         self.text_raw = text
         
-        self.text = self.font.render(text, True, (0, 0, 0))
+        self.text = text_cache.render(self.font, text, True, (0, 0, 0))
         self.rect = rect
         self.char = char
         self.event = event
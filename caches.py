@@ -0,0 +1,115 @@
+import pygame
+
+from collections import OrderedDict
+
+class ChunkSurfaceCache:
+    # Chunks rasterized once per zoom level, so drawing the grid is one blit per
+    # visible chunk. Surfaces are evicted least recently used first once they
+    # take up more than budget bytes, except for the ones drawn last frame.
+    # Whatever changes or unloads a chunk has to invalidate() it.
+
+    def __init__(self, rasterize, budget = 64 * 1024 * 1024):
+        self.rasterize = rasterize
+        self.budget = budget
+        self.used = 0
+        self.surfaces = OrderedDict()
+        self.frame = 0
+        self.hits = 0
+        self.misses = 0
+
+    def next_frame(self):
+        # Evict between frames so a frame never throws out a surface it is about to draw
+        while self.used > self.budget:
+            oldest = next(iter(self.surfaces))
+            if self.surfaces[oldest][2] == self.frame:
+                break
+            self.discard(oldest)
+        self.frame += 1
+
+    def get(self, chunk, tile_size):
+        key = (chunk.x, chunk.y, tile_size)
+        entry = self.surfaces.get(key)
+        if entry is not None:
+            self.surfaces.move_to_end(key)
+            entry[2] = self.frame
+            self.hits += 1
+            return entry[0]
+
+        self.misses += 1
+        # Empty chunks are remembered as None so they are not rasterized again
+        surface = None if chunk.is_empty() else self.rasterize(chunk, tile_size)
+        size = surface.get_width() * surface.get_height() * surface.get_bytesize() if surface else 0
+        self.surfaces[key] = [surface, size, self.frame]
+        self.used += size
+        return surface
+
+    def discard(self, key):
+        self.used -= self.surfaces.pop(key)[1]
+
+    def invalidate(self, chunks):
+        # Drop every zoom level of the chunks at the given coords
+        chunks = set(chunks)
+        for key in [key for key in self.surfaces if key[:2] in chunks]:
+            self.discard(key)
+
+class SpriteCache:
+    # Scaled copies of sprites keyed by (source surface, target size), so sprites
+    # are only rescaled when the zoom changes instead of every frame
+
+    def __init__(self, max_entries = 1024):
+        self.max_entries = max_entries
+        self.sprites = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def scale(self, surface, size):
+        key = (surface, (int(size[0]), int(size[1])))
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            self.hits += 1
+            return sprite
+
+        self.misses += 1
+        sprite = self.sprites[key] = pygame.transform.scale(surface, key[1])
+        if len(self.sprites) > self.max_entries:
+            self.sprites.popitem(last = False)
+        return sprite
+
+class TextCache:
+    # Rendered text keyed by (font, text, antialias, color), so a string is only
+    # rasterized again once it has fallen out of the last max_entries used.
+    # Surfaces are shared between callers, they must be blitted and never drawn on
+
+    def __init__(self, max_entries = 512):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, make):
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        surface = self.surfaces[key] = make()
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last = False)
+            self.evictions += 1
+        return surface
+
+    def render(self, font, text, antialias, color):
+        color = tuple(color)
+        return self.get((font, text, antialias, color), lambda: font.render(text, antialias, color))
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'entries': len(self.surfaces), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0}
+
+# Shared by every bit of text drawn, user_interface's outlined text included
+text_cache = TextCache()
@@ -0,0 +1,98 @@
+import pygame
+
+from collections import Counter
+
+class DirtyRects:
+    # The parts of the screen changed since it was last shown. present() sends
+    # only those to the display, or flips the whole screen after invalidate()
+    # or once there are so many that updating them one by one would cost more
+
+    def __init__(self, screen, max_rects = 64, max_area = 0.5):
+        self.screen = screen
+        self.max_rects = max_rects
+        self.max_area = max_area * screen.get_width() * screen.get_height()  # Pixels
+        self.rects = []
+        self.area = 0
+        self.full = True
+        self.flips = 0
+        self.updates = 0
+        self.skipped = 0
+
+    def add(self, rect):
+        if self.full:
+            return
+        rect = rect.clip(self.screen.get_rect())
+        if rect.width and rect.height:
+            self.rects.append(rect)
+            self.area += rect.width * rect.height
+            if len(self.rects) > self.max_rects or self.area > self.max_area:
+                self.invalidate()
+
+    def invalidate(self):
+        self.full = True
+        self.rects = []
+        self.area = 0
+
+    def present(self):
+        if self.full:
+            pygame.display.flip()
+            self.flips += 1
+        elif self.rects:
+            pygame.display.update(self.rects)
+            self.updates += 1
+        else:
+            self.skipped += 1
+        self.full = False
+        self.rects = []
+        self.area = 0
+
+class Layer:
+    # What is drawn over a background that rarely changes, like the sprites and
+    # HUD over the world under the camera. A frame's blits are collected with
+    # blit() and compared with the last frame's by present(): only where a blit
+    # appeared, went away, moved or changed surface is the background put back
+    # and drawn over again, so a frame where nothing moved draws nothing at all.
+    # Blits are counted, not just noted, since the same sprite stacked twice on
+    # one spot (a batch of summons) shows its translucent edges darker than once.
+    # Anything that changes the background calls invalidate() to redraw it whole
+
+    def __init__(self, screen, dirty):
+        self.screen = screen
+        self.dirty = dirty
+        self.background = screen.copy()
+        self.blits = []
+        self.drawn = Counter()  # Last frame's blits, (surface, x, y): how many times
+        self.stale = True
+
+    def blit(self, surface, position):
+        self.blits.append((surface, pygame.Rect(position, surface.get_size())))
+
+    def invalidate(self):
+        self.stale = True
+
+    def present(self):
+        blits, self.blits = self.blits, []
+        drawn = Counter((surface, rect.x, rect.y) for surface, rect in blits)
+        if not self.stale:
+            changed = [pygame.Rect((x, y), surface.get_size()) for surface, x, y in drawn.keys() | self.drawn.keys()
+                       if drawn[surface, x, y] != self.drawn[surface, x, y]]
+            for rect in changed:
+                self.dirty.add(rect)
+            if not self.dirty.full:
+                # Put the background back under everything that changed, then redraw
+                # whatever overlaps it, clipped so nothing is drawn over itself twice
+                rects = [rect for surface, rect in blits]
+                for rect in changed:
+                    self.screen.set_clip(rect)
+                    self.screen.blit(self.background, rect, rect)
+                    for i in rect.collidelistall(rects):
+                        self.screen.blit(blits[i][0], rects[i])
+                self.screen.set_clip(None)
+        if self.stale or self.dirty.full:
+            self.screen.blit(self.background, (0, 0))
+            for surface, rect in blits:
+                self.screen.blit(surface, rect)
+            self.dirty.invalidate()
+            self.stale = False
+        self.drawn = drawn
+        self.dirty.present()
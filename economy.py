@@ -0,0 +1,181 @@
+import math
+
+# Everything the game's balance is tuned with: what summons cost, what the
+# portal sells at each level, the gatherers' and task masters' stats and which
+# resources are found how far from the portal. Kept free of pygame so balance.py
+# can play the economy headless.
+
+RESOURCES = ("Essence", "Wood", "Gold", "Iron", "Rubies", "Demonic Iron", "Pure Essence")
+
+# Relative weights of the resources deposits are made of, one table per distance band from the portal (see world.resource_band)
+DEPOSIT_WEIGHTS = [
+    {"Essence":2, "Wood":1},
+    {"Essence":3, "Iron":2, "Wood":1, "Gold":1},
+    {"Rubies":3, "Essence":2, "Demonic Iron":1},
+    {"Demonic Iron":2, "Pure Essence":2, "Rubies":1},
+]
+
+# Gatherer() arguments by name, speeds are per tick
+GATHERERS = {
+    'Green Worker Slime': {'description':'Basic Gathering Slime can collect Wood and Essence', 'max_capacity':10, 'gathering_speed':1, 'moving_speed':0.02, 'resources_gatherable':['Wood','Essence']},
+    'Blue Worker Slime': {'description':'Gathering Slime can collect Iron, Wood, and Essence', 'max_capacity':25, 'gathering_speed':3, 'moving_speed':0.03, 'resources_gatherable':['Iron', 'Wood', 'Essence']},
+    'Red Worker Slime': {'description':'Gathering Slime can collect Iron, Gold, and Essence', 'max_capacity':50, 'gathering_speed':5, 'moving_speed':0.04, 'resources_gatherable':['Iron', 'Gold','Essence']},
+    'Purple Worker Slime': {'description':'Gathering Slime can collect Rubies, Gold, and Essence', 'max_capacity':200, 'gathering_speed':10, 'moving_speed':0.06, 'resources_gatherable':['Rubies', 'Gold', 'Essence']},
+    'Black Worker Slime': {'description':'Gathering Slime can collect Rubies, Demonic Iron and Pure Essence', 'max_capacity':500, 'gathering_speed':25, 'moving_speed':0.06, 'resources_gatherable':['Rubies', 'Demonic Iron',' Pure Essence']},
+}
+
+# TaskMaster() arguments by name
+TASK_MASTERS = {
+    'Minor Demon': {'description':'Increases the movement speed of workers', 'moving_speed':0.01, 'effect':{'moving_speed':{'method':'additive','magnitude':0.01}}},
+    'Demon': {'description':'Increases the gathering speed and capacity of workers', 'moving_speed':0.01, 'effect':{'gathering_speed':{'method':'additive','magnitude':1},'max_capacity':{'method':'additive','magnitude':10}}},
+    'Major Demon': {'description':'Increases the gathering speed and capacity of workers', 'moving_speed':0.01, 'effect':{'gathering_speed':{'method':'multiplicative','magnitude':1.2},'max_capacity':{'method':'multiplicative','magnitude':1.2}}},
+    'Demon Overlord': {'description':'Increases the gathering speed and capacity of workers', 'moving_speed':0.01, 'effect':{'gathering_speed':{'method':'multiplicative','magnitude':2},'max_capacity':{'method':'multiplicative','magnitude':2}}},
+}
+
+LEVELS = {
+    'Level 1': 'Gain access to Blue Worker Slime',
+    'Level 2': 'Gain access to Minor Demon Taskmasters',
+    'Level 3': 'Gain access to Demon Taskmasters',
+    'Level 4': 'Gain access to Blue Worker Slime',
+    'Level 5': 'Gain access to Minor Demon Taskmasters',
+    'Level 6': 'Gain access to Major Demon Taskmasters',
+}
+
+# The n-th summon of a kind costs round(base * multiplier ** n) of each resource
+COSTS = {
+    'Green Worker Slime':{'Essence':{'base':5,'multiplier':1.1}},
+    'Blue Worker Slime': {'Essence':{'base':20,'multiplier':1.2}},
+    'Red Worker Slime': {'Essence':{'base':200,'multiplier':1.2}},
+    'Purple Worker Slime': {'Essence':{'base':10000,'multiplier':1.2}},
+    'Black Worker Slime': {'Essence':{'base':100000,'multiplier':1.2}},
+    'Minor Demon': {'Essence':{'base':50,'multiplier':2.5}},
+    'Demon': {'Essence':{'base':200,'multiplier':2.5}},
+    'Major Demon': {'Essence':{'base':2500,'multiplier':3}},
+    'Demon Overlord': {'Pure Essence':{'base':250000,'multiplier':10}},
+}
+
+# What the portal sells at each level: how many of each summon (priced from COSTS)
+# and the upgrade to the next level, which has its own cost and a LEVELS reward
+RECIPES = {
+    0:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Upgrade Portal':{'reward':'Level 1', 'cost':{'Wood':{'base':200,'multiplier':1.5}}, 'bought':0, 'quantity':1},},
+    1:{'Green Worker Slime':{'bought':0, 'quantity':10},
+       'Blue Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':0, 'quantity':2},
+       'Upgrade Portal':{'reward':'Level 2', 'cost':{'Wood':{'base':1000,'multiplier':1.8},'Iron':{'base':1000,'multiplier':1.8}}, 'bought':0, 'quantity':1},},
+    2:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Blue Worker Slime':{'bought':10, 'quantity':10},
+       'Red Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':2, 'quantity':2},
+       'Demon':{'bought':0, 'quantity':2},
+       'Upgrade Portal':{'reward':'Level 3', 'cost':{'Wood':{'base':5000,'multiplier':1.8}, 'Iron':{'base':5000,'multiplier':1.8}, 'Gold':{'base':5000,'multiplier':1.8}}, 'bought':0, 'quantity':1},},
+    3:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Blue Worker Slime':{'bought':0, 'quantity':10},
+       'Red Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':0, 'quantity':2},
+       'Demon':{'bought':0, 'quantity':2},
+       'Major Demon':{'bought':0, 'quantity':2},
+       'Upgrade Portal':{'reward':'Level 3', 'cost':{'Wood':{'base':100000,'multiplier':1.8}, 'Iron':{'base':100000,'multiplier':1.8}, 'Gold':{'base':100000,'multiplier':1.8}}, 'bought':0, 'quantity':1},},
+    4:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Blue Worker Slime':{'bought':0, 'quantity':10},
+       'Red Worker Slime':{'bought':0, 'quantity':10},
+       'Purple Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':0, 'quantity':2},
+       'Demon':{'bought':0, 'quantity':2},
+       'Major Demon':{'bought':0, 'quantity':2},
+       'Upgrade Portal':{'reward':'Level 3', 'cost':{'Wood':{'base':1000000,'multiplier':1.8}, 'Iron':{'base':1000000,'multiplier':1.8}, 'Gold':{'base':1000000,'multiplier':1.8}, 'Rubies':{'base':1000000,'multiplier':1.8}}, 'bought':0, 'quantity':1},},
+    5:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Blue Worker Slime':{'bought':0, 'quantity':10},
+       'Red Worker Slime':{'bought':0, 'quantity':10},
+       'Purple Worker Slime':{'bought':0, 'quantity':10},
+       'Black Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':0, 'quantity':2},
+       'Demon':{'bought':0, 'quantity':2},
+       'Major Demon':{'bought':0, 'quantity':2},
+       'Demon Overlord':{'bought':0, 'quantity':2},
+       'Upgrade Portal':{'reward':'Level 3', 'cost':{'Wood':{'base':10000000,'multiplier':1.8}, 'Iron':{'base':10000000,'multiplier':1.8}, 'Gold':{'base':10000000,'multiplier':1.8}, 'Rubies':{'base':10000000,'multiplier':1.8}, 'Demonic Iron':{'base':10000000,'multiplier':1.8}}, 'bought':0, 'quantity':1},},
+    6:{'Green Worker Slime':{'bought':0, 'quantity':20},
+       'Blue Worker Slime':{'bought':0, 'quantity':10},
+       'Red Worker Slime':{'bought':0, 'quantity':10},
+       'Purple Worker Slime':{'bought':0, 'quantity':10},
+       'Black Worker Slime':{'bought':0, 'quantity':10},
+       'Minor Demon':{'bought':0, 'quantity':2},
+       'Demon':{'bought':0, 'quantity':2},
+       'Major Demon':{'bought':0, 'quantity':2},
+       'Demon Overlord':{'bought':0, 'quantity':2},
+       },
+}
+
+def resource_mappings(rng, resource_ids, weights = DEPOSIT_WEIGHTS):
+    # For each band, a pick from 1 to 100 to the id of the resource a deposit with that pick is made of.
+    # rng is the random module seeded with the world's seed, picks are drawn a band at a time for each pick
+    mappings = [{} for band in weights]
+    for i in range(1, 101):
+        for mapping, band in zip(mappings, weights):
+            mapping[i] = resource_ids[rng.choices(list(band.keys()), list(band.values()), k=1)[0]]
+    return mappings
+
+def make_recipes(rewards, costs = COSTS, recipes = RECIPES):
+    # The shop's recipes, {level: {name: {'reward', 'cost', 'quantity'}}}, where
+    # cost holds each resource's base and multiplier and how many were bought.
+    # rewards maps a summon's name (or a level's) to what buying it gives
+    made = {}
+    for level, items in recipes.items():
+        made[level] = {}
+        for name, item in items.items():
+            cost = dict(item['cost'] if 'cost' in item else costs[name])
+            cost['bought'] = item['bought']
+            made[level][name] = {'reward':rewards[item.get('reward', name)], 'cost':cost, 'quantity':item['quantity']}
+    return made
+
+def carry_over(recipes, level):
+    # Moving up to a level keeps what was left and bought at the one before
+    for name, recipe_data in recipes[level-1].items():
+        if name in recipes[level].keys():
+            recipes[level][name]['quantity'] += recipe_data['quantity']
+            recipes[level][name]['cost']['bought'] = recipe_data['cost']['bought']
+
+def series(multiplier, count):
+    # 1 + multiplier + ... + multiplier**(count-1), what count summons cost in units of the first one's price
+    if count == 1 or multiplier == 1:
+        return count
+    return (multiplier**count - 1) / (multiplier - 1)
+
+def price(costs, count = 1):
+    # {resource: amount} the next count cost together, rounded once for the whole batch
+    return {resource: round(cost['base']*cost['multiplier']**costs['bought'] * series(cost['multiplier'], count)) for resource, cost in costs.items() if resource != 'bought'}
+
+def can_buy(resource_quantities, costs, count = 1):
+    for resource, total_cost in price(costs, count).items():
+        if total_cost > resource_quantities[resource]:
+            return False
+    return True
+
+def max_affordable(resource_quantities, costs, limit):
+    # The most that can be bought at once, up to limit. Solving the series for
+    # count gives it straight from the scarcest resource, rounding can leave it one off
+    count = limit
+    for resource, cost in costs.items():
+        if resource == 'bought':
+            continue
+        first = cost['base']*cost['multiplier']**costs['bought']
+        if cost['multiplier'] == 1:
+            count = min(count, int(resource_quantities[resource] // first))
+        else:
+            count = min(count, int(math.log(resource_quantities[resource] * (cost['multiplier'] - 1) / first + 1, cost['multiplier'])))
+    count = max(count, 0)
+    while count > 0 and not can_buy(resource_quantities, costs, count):
+        count -= 1
+    while count < limit and can_buy(resource_quantities, costs, count + 1):
+        count += 1
+    return count
+
+def pay(resource_quantities, costs, count = 1):
+    for resource, total_cost in price(costs, count).items():
+        resource_quantities[resource] -= total_cost
+
+def buy(resource_quantities, recipe_data, count = 1):
+    # Summoning count at once: pay for them together and take them off the portal's stock
+    pay(resource_quantities, recipe_data['cost'], count)
+    recipe_data['quantity'] -= count
+    recipe_data['cost']['bought'] += count
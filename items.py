@@ -1,5 +1,6 @@
 import pygame
 
+from caches import text_cache
 from spritesheets import spritesheet
 from buttons import Button, ButtonGroup
 
@@ -78,7 +79,7 @@ class Items:
         self.inventory.try_move(self)
             
     def render(self, x=0,y=0):
-        self.text = self.font.render(str(self.quantity), False, (255, 255, 255))
+        self.text = text_cache.render(self.font, str(self.quantity), False, (255, 255, 255))
         if self.selected == True:
             if x != 0:
                 if self.index <= self.inventory.columns:
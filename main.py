@@ -1,32 +1,17 @@
 import random
 from typing import List
 from typing import Tuple
-import sys, asyncio, math, time, os, copy
+import sys, asyncio, math, os, copy, argparse
 
 import pygame
 
 from user_interface import StartMenu, Overlay, DeathMenu, Button, ButtonGroup
 from spritesheets import spritesheet
-
-def point_along_line(from_point, to_point, distance):
-    # Calculate the vector from "from" point to "to" point
-    dx = to_point[0] - from_point[0]
-    dy = to_point[1] - from_point[1]
-
-    # Calculate the distance between the two points
-    length = math.sqrt(dx**2 + dy**2)
-
-    # Normalize the vector to get the direction
-    if length > 0:
-        dx /= length
-        dy /= length
-
-    # Scale the direction vector by the distance
-    if distance > length:
-        new_point = (from_point[0] + dx * length, from_point[1] + dy * length)
-    else:
-        new_point = (from_point[0] + dx * distance, from_point[1] + dy * distance)
-    return new_point
+import world
+from caches import ChunkSurfaceCache, SpriteCache, text_cache
+from display import DirtyRects, Layer
+from simulation import Simulation, GathererModel, Trip, RealClock, TICK_RATE
+import economy
 
 def determine_direction(point1, point2):
     dx = point2[0] - point1[0]
@@ -60,26 +45,11 @@ def format_large_number(number):
 
     return formatted_number
 
-class Gatherer:
+class Gatherer(GathererModel):
 
     def __init__(self, props, name, description, max_capacity, gathering_speed, moving_speed, resources_gatherable,animations):
+        super().__init__(name, description, max_capacity, gathering_speed, moving_speed, resources_gatherable)
         self.props = props
-        self.name = name
-        self.description = description
-
-        self.base_max_capacity = max_capacity
-        self.max_capacity = max_capacity
-        self.base_gathering_speed = gathering_speed
-        self.gathering_speed = gathering_speed
-        self.base_moving_speed = moving_speed
-        self.moving_speed = moving_speed
-
-        self.gathering_wait = 1/self.gathering_speed
-        self.last_gather_time = 0
-        self.resources_gatherable = resources_gatherable
-        self.inventory = {}
-        for resource in self.resources_gatherable:
-            self.inventory[resource] = 0
         self.animations_file = animations
         self.height = 32
         self.width = 32
@@ -88,82 +58,26 @@ class Gatherer:
                                      'left':animations.images_at([(i*self.width,self.height*2,self.width,32) for i in range(5)]),
                                      'right':animations.images_at([(i*self.width,self.height*3,self.width,32) for i in range(5)])}}
         self.current_frame = 0
-        self.state = 'idle'
-        self.position = (0,0)
         self.fixed_point = False
         self.fixed_size = False
-        self.assignment = None
-        self.moving = False
-        self.first_gather = True
-
-    def update_stats(self):
-        self.max_capacity = (self.base_max_capacity+self.props.bonuses['max_capacity']['additive'])*self.props.bonuses['max_capacity']['multiplicative']
-        self.gathering_speed = (self.base_gathering_speed+self.props.bonuses['gathering_speed']['additive'])*self.props.bonuses['gathering_speed']['multiplicative']
-        self.moving_speed = (self.base_moving_speed+self.props.bonuses['moving_speed']['additive'])*self.props.bonuses['moving_speed']['multiplicative']
-        self.gathering_wait = 1/self.gathering_speed
 
     def assign(self, selected_tile):
-        if selected_tile[0] in self.props.assignments:
+        deposit_id = selected_tile[0]
+        if deposit_id in self.props.assignments:
             self.props.tooltip = "Another Worker is already assigned to that resource"
             self.props.tooltip_ticks = 60
-        elif selected_tile[2] in self.resources_gatherable:
+        elif self.props.deposit_resource(deposit_id) in self.resources_gatherable:
             if self.assignment:
                 del self.props.assignments[self.assignment[0]]
-            self.assignment = selected_tile
+            self.set_assignment([deposit_id, selected_tile[1], self.props.deposit_resource(deposit_id), selected_tile[3]])
+            self.props.assignments[deposit_id] = self
             self.props.selected_gatherer = None
-            self.state = 'gathering'
         else:
             self.props.tooltip = "I cannot gather that resource"
             self.props.tooltip_ticks = 60
 
 
-    def run(self):
-        if self.state == 'idle':
-            pass
-        elif self.state in 'gathering':
-            self.gather()
-        elif self.state == 'drop off':
-            self.drop_off()
-        
-    def drop_off(self):
-            if math.dist(self.position,(0,0)) > 0.5:
-                self.position = point_along_line(self.position,(0,0),self.moving_speed)
-                self.direction = determine_direction((self.assignment[1].x,self.assignment[1].y), self.screen_position)
-                self.moving = True
-            else:
-                self.props.resource_quantities[self.assignment[2]] += self.inventory[self.assignment[2]]
-                self.inventory[self.assignment[2]] = 0
-                self.state = 'gathering'
-
-    def gather(self):
-        if self.assignment:
-            x,y = self.assignment[0]
-            self.assignment[1] = pygame.Rect(x * self.props.TILE_SIZE + self.props.player_x, y * self.props.TILE_SIZE + self.props.player_y, self.props.TILE_SIZE, self.props.TILE_SIZE)
-            if math.dist(self.position,self.assignment[0]) > 0.5:
-                self.position = point_along_line(self.position,self.assignment[0],self.moving_speed)
-                self.direction = determine_direction(self.screen_position, (self.assignment[1].x,self.assignment[1].y))
-                self.moving = True
-            else:
-                self.state = 'gathering'
-                self.try_gather()
-
-    def try_gather(self):
-        current_time = time.time()
-        if current_time - self.last_gather_time >= self.gathering_wait:
-            if self.first_gather:
-                self.inventory[self.assignment[2]] += 1
-                self.first_gather = False
-            else:
-                self.inventory[self.assignment[2]] += math.ceil((current_time - self.last_gather_time) / self.gathering_wait)
-            self.last_gather_time = current_time
-            print(current_time,self.last_gather_time,self.gathering_wait)
-            if self.inventory[self.assignment[2]] >= self.max_capacity:
-                self.state = 'drop off'
-                self.first_gather = True
-
-
     def render(self):
-        self.run()
         if not self.fixed_point:
             self.screen_position = (self.position[0]*self.props.TILE_SIZE + self.props.player_x,self.position[1]*self.props.TILE_SIZE + self.props.player_y)
         else:
@@ -184,13 +98,16 @@ class Gatherer:
 
 
             # Render the current animation frame based on the direction
-            self.props.screen.blit(pygame.transform.scale(self.animations['moving'][self.direction][0],self.size),self.screen_position)
+            self.props.draw(self.props.sprite_cache.scale(self.animations['moving'][self.direction][0],self.size),self.screen_position)
         else:
             if self.state in ['idle','gathering']:
-                self.props.screen.blit(pygame.transform.scale(self.animations['moving']['down'][0],self.size),self.screen_position)
+                self.props.draw(self.props.sprite_cache.scale(self.animations['moving']['down'][0],self.size),self.screen_position)
 
     def copy(self):
-        return Gatherer(self.props, self.name, self.description, self.max_capacity, self.gathering_speed, self.moving_speed, self.resources_gatherable,self.animations_file)
+        gatherer = Gatherer(self.props, self.name, self.description, self.max_capacity, self.gathering_speed, self.moving_speed, self.resources_gatherable,self.animations_file)
+        # Share the frame images so their scaled copies are cached once for every slime of a kind
+        gatherer.animations = {'moving':{direction:list(frames) for direction, frames in self.animations['moving'].items()}}
+        return gatherer
 
 class TaskMaster:
 
@@ -201,7 +118,12 @@ class TaskMaster:
         self.moving_speed = moving_speed
         self.effect = effect
 
-        self.target_change_chance = 0.003
+        self.target_change_chance = 0.003  # Per tick
+        self.aim_ticks = 25  # Ticks between aiming at where the target has got to
+        self.simulation = None  # Set once summoned
+        self.trip = None
+        self.due = None
+        self.switch_tick = 0
         
         self.animations_file = animations
         self.height = 64
@@ -221,24 +143,44 @@ class TaskMaster:
         self.direction = 'down'
         self.target = None
 
-    def run(self):
-        if self.target == None:
-            self.find_target()
-        if self.target:
-            if math.dist(self.position,self.target.position) > 0.5:
-                self.position = point_along_line(self.position,self.target.position,self.moving_speed)
-                self.direction = determine_direction(self.screen_position, self.target.screen_position)
-                self.moving = True
-            if random.random() < self.target_change_chance:
-                self.find_target()
-        
-
-    def find_target(self):
-        choices = [x for x in self.props.gatherers if x not in [x.target for x in self.props.task_masters]]
-        if choices:
-            self.target = random.choice(choices)
-        else:
-            self.target = None
+    @property
+    def position(self):
+        if self.trip is None:
+            return self._position
+        return self.trip.position(self.simulation.ticks)
+
+    @position.setter
+    def position(self, position):
+        self._position = position
+        self.trip = None
+
+    def update(self, simulation):
+        # Runs when the task master reaches the end of its trip, is due to aim at
+        # where its target has got to or decides to follow someone else, and
+        # sets off on the next trip. Returns the tick it wants to run again
+        now = simulation.ticks
+        if self.target is None or now >= self.switch_tick:
+            self.find_target(simulation)
+            # Ticks until the next switch, as if target_change_chance were rolled every tick
+            self.switch_tick = now + 1 + int(math.log(1 - simulation.random.random()) / math.log(1 - self.target_change_chance))
+        position = self.position
+        if self.target is None:
+            self.position = position
+            return now + self.aim_ticks
+        goal = self.target.position
+        self.trip = Trip(position, goal, now, self.moving_speed)
+        if self.trip.ticks:
+            self.direction = determine_direction(position, goal)
+            self.moving = True
+        return min(max(self.trip.arrival, now + 1), now + self.aim_ticks, self.switch_tick)
+
+
+    def find_target(self, simulation):
+        # Switch to a gatherer nobody is following, then give up the old one
+        target = simulation.claim_target()
+        if self.target is not None:
+            simulation.release_target(self.target)
+        self.target = target
 
     def render(self):
 
@@ -261,17 +203,16 @@ class TaskMaster:
                 for direction, animation_frames in self.animations['moving'].items():
                     self.animations['moving'][direction] = animation_frames[1:] + [animation_frames[0]]
 
-                self.direction = 'down' #determine_direction(self.screen_position, (self.assignment[1].x,self.assignment[1].y))
-
             # Render the current animation frame based on the direction
-            self.props.screen.blit(pygame.transform.scale(self.animations['moving'][self.direction][0],self.size),self.screen_position)
+            self.props.draw(self.props.sprite_cache.scale(self.animations['moving'][self.direction][0],self.size),self.screen_position)
         else:
             if self.state in ['idle','gathering']:
-                self.props.screen.blit(pygame.transform.scale(self.animations['moving']['down'][0],self.size),self.screen_position)
-        self.run()
+                self.props.draw(self.props.sprite_cache.scale(self.animations['moving']['down'][0],self.size),self.screen_position)
 
     def copy(self):
-        return TaskMaster(self.props, self.name, self.description, self.moving_speed, self.animations_file, self.effect)
+        task_master = TaskMaster(self.props, self.name, self.description, self.moving_speed, self.animations_file, self.effect)
+        task_master.animations = {'moving':{direction:list(frames) for direction, frames in self.animations['moving'].items()}}
+        return task_master
 
 
 class Descriptions:
@@ -291,97 +232,84 @@ class PortalSummoning:
 
         self.summon_sound = pygame.mixer.Sound("Summon.wav")
 
-        self.g_w_slime = Gatherer(props, 'Green Worker Slime','Basic Gathering Slime can collect Wood and Essence',10,1,0.02,['Wood','Essence'],spritesheet("SlimeWorker-Sheet.png"))
-        self.b_w_slime = Gatherer(props, 'Blue Worker Slime','Gathering Slime can collect Iron, Wood, and Essence',25,3,0.03,['Iron', 'Wood', 'Essence'],spritesheet("BlueSlimeWorker-Sheet.png"))
-        self.r_w_slime = Gatherer(props, 'Red Worker Slime','Gathering Slime can collect Iron, Gold, and Essence',50,5,0.04,['Iron', 'Gold','Essence'],spritesheet("RedSlimeWorker-Sheet.png"))
-        self.p_w_slime = Gatherer(props, 'Purple Worker Slime','Gathering Slime can collect Rubies, Gold, and Essence',200,10,0.06,['Rubies', 'Gold', 'Essence'],spritesheet("PurpleSlimeWorker-Sheet.png"))
-        self.bk_w_slime = Gatherer(props, 'Black Worker Slime','Gathering Slime can collect Rubies, Demonic Iron and Pure Essence',500,25,0.06,['Rubies', 'Demonic Iron',' Pure Essence'],spritesheet("BlackSlimeWorker-Sheet.png"))
-
-
-        self.minor_demon = TaskMaster(props, 'Minor Demon', 'Increases the movement speed of workers',0.01,spritesheet('MinorDemon.png'),{'moving_speed':{'method':'additive','magnitude':0.01}})
-        self.demon = TaskMaster(props, 'Demon', 'Increases the gathering speed and capacity of workers',0.01,spritesheet('Demon.png'),{'gathering_speed':{'method':'additive','magnitude':1},'max_capacity':{'method':'additive','magnitude':10}})
-        self.major_demon = TaskMaster(props, 'Major Demon', 'Increases the gathering speed and capacity of workers',0.01,spritesheet('MajorDemon.png'),{'gathering_speed':{'method':'multiplicative','magnitude':1.2},'max_capacity':{'method':'multiplicative','magnitude':1.2}})
-        self.demon_overlord = TaskMaster(props, 'Demon Overlord', 'Increases the gathering speed and capacity of workers',0.01,spritesheet('DemonOverlord.png'),{'gathering_speed':{'method':'multiplicative','magnitude':2},'max_capacity':{'method':'multiplicative','magnitude':2}})
-
-
-        self.level_1_description = Descriptions(props,'Level 1','Gain access to Blue Worker Slime')
-        self.level_2_description = Descriptions(props,'Level 2','Gain access to Minor Demon Taskmasters')
-        self.level_3_description = Descriptions(props,'Level 3','Gain access to Demon Taskmasters')
-        self.level_4_description = Descriptions(props,'Level 4','Gain access to Blue Worker Slime')
-        self.level_5_description = Descriptions(props,'Level 5','Gain access to Minor Demon Taskmasters')
-        self.level_6_description = Descriptions(props,'Level 6','Gain access to Major Demon Taskmasters')
-
-        self.costs = {
-            'Green Worker Slime':{'Essence':{'base':5,'multiplier':1.1}},
-            'Blue Worker Slime': {'Essence':{'base':20,'multiplier':1.2}},
-            'Red Worker Slime': {'Essence':{'base':200,'multiplier':1.2}},
-            'Purple Worker Slime': {'Essence':{'base':10000,'multiplier':1.2}},
-            'Black Worker Slime': {'Essence':{'base':100000,'multiplier':1.2}},
-            'Minor Demon': {'Essence':{'base':50,'multiplier':2.5}},
-            'Demon': {'Essence':{'base':200,'multiplier':2.5}},
-            'Major Demon': {'Essence':{'base':2500,'multiplier':3}},
-            'Demon Overlord': {'Pure Essence':{'base':250000,'multiplier':10}},
-        }
+        self.g_w_slime = Gatherer(props, 'Green Worker Slime', animations=spritesheet("SlimeWorker-Sheet.png"), **economy.GATHERERS['Green Worker Slime'])
+        self.b_w_slime = Gatherer(props, 'Blue Worker Slime', animations=spritesheet("BlueSlimeWorker-Sheet.png"), **economy.GATHERERS['Blue Worker Slime'])
+        self.r_w_slime = Gatherer(props, 'Red Worker Slime', animations=spritesheet("RedSlimeWorker-Sheet.png"), **economy.GATHERERS['Red Worker Slime'])
+        self.p_w_slime = Gatherer(props, 'Purple Worker Slime', animations=spritesheet("PurpleSlimeWorker-Sheet.png"), **economy.GATHERERS['Purple Worker Slime'])
+        self.bk_w_slime = Gatherer(props, 'Black Worker Slime', animations=spritesheet("BlackSlimeWorker-Sheet.png"), **economy.GATHERERS['Black Worker Slime'])
+
+
+        self.minor_demon = TaskMaster(props, 'Minor Demon', animations=spritesheet('MinorDemon.png'), **economy.TASK_MASTERS['Minor Demon'])
+        self.demon = TaskMaster(props, 'Demon', animations=spritesheet('Demon.png'), **economy.TASK_MASTERS['Demon'])
+        self.major_demon = TaskMaster(props, 'Major Demon', animations=spritesheet('MajorDemon.png'), **economy.TASK_MASTERS['Major Demon'])
+        self.demon_overlord = TaskMaster(props, 'Demon Overlord', animations=spritesheet('DemonOverlord.png'), **economy.TASK_MASTERS['Demon Overlord'])
 
-        self.recipes = {
-            0:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Upgrade Portal':{'reward':self.level_1_description,'cost':{'Wood':{'base':200,'multiplier':1.5}, 'bought':0}, 'quantity':1},},
-            1:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':0},'quantity':2},
-               'Upgrade Portal':{'reward':self.level_2_description,'cost':{'Wood':{'base':1000,'multiplier':1.8},'Iron':{'base':1000,'multiplier':1.8}, 'bought':0}, 'quantity':1},},
-            2:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':10},'quantity':10},
-               'Red Worker Slime': {'reward':self.r_w_slime,'cost':{'Essence':self.costs['Red Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':2},'quantity':2},
-               'Demon': {'reward':self.demon,'cost':{'Essence':self.costs['Demon']['Essence'], 'bought':0},'quantity':2},
-               'Upgrade Portal':{'reward':self.level_3_description,'cost':{'Wood':{'base':5000,'multiplier':1.8}, 'Iron':{'base':5000,'multiplier':1.8}, 'Gold':{'base':5000,'multiplier':1.8}, 'bought':0}, 'quantity':1},},
-            3:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Red Worker Slime': {'reward':self.r_w_slime,'cost':{'Essence':self.costs['Red Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon': {'reward':self.demon,'cost':{'Essence':self.costs['Demon']['Essence'], 'bought':0},'quantity':2},
-               'Major Demon': {'reward':self.major_demon,'cost':{'Essence':self.costs['Major Demon']['Essence'], 'bought':0},'quantity':2},
-                'Upgrade Portal':{'reward':self.level_3_description,'cost':{'Wood':{'base':100000,'multiplier':1.8}, 'Iron':{'base':100000,'multiplier':1.8}, 'Gold':{'base':100000,'multiplier':1.8}, 'bought':0}, 'quantity':1},},
-            4:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Red Worker Slime': {'reward':self.r_w_slime,'cost':{'Essence':self.costs['Red Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Purple Worker Slime': {'reward':self.p_w_slime,'cost':{'Essence':self.costs['Purple Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon': {'reward':self.demon,'cost':{'Essence':self.costs['Demon']['Essence'], 'bought':0},'quantity':2},
-               'Major Demon': {'reward':self.major_demon,'cost':{'Essence':self.costs['Major Demon']['Essence'], 'bought':0},'quantity':2},
-               'Upgrade Portal':{'reward':self.level_3_description,'cost':{'Wood':{'base':1000000,'multiplier':1.8}, 'Iron':{'base':1000000,'multiplier':1.8}, 'Gold':{'base':1000000,'multiplier':1.8}, 'Rubies':{'base':1000000,'multiplier':1.8}, 'bought':0}, 'quantity':1},},
-            5:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Red Worker Slime': {'reward':self.r_w_slime,'cost':{'Essence':self.costs['Red Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Purple Worker Slime': {'reward':self.p_w_slime,'cost':{'Essence':self.costs['Purple Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Black Worker Slime': {'reward':self.bk_w_slime,'cost':{'Essence':self.costs['Black Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon': {'reward':self.demon,'cost':{'Essence':self.costs['Demon']['Essence'], 'bought':0},'quantity':2},
-               'Major Demon': {'reward':self.major_demon,'cost':{'Essence':self.costs['Major Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon Overlord': {'reward':self.demon_overlord,'cost':{'Pure Essence':self.costs['Demon Overlord']['Pure Essence'], 'bought':0},'quantity':2},
-               'Upgrade Portal':{'reward':self.level_3_description,'cost':{'Wood':{'base':10000000,'multiplier':1.8}, 'Iron':{'base':10000000,'multiplier':1.8}, 'Gold':{'base':10000000,'multiplier':1.8}, 'Rubies':{'base':10000000,'multiplier':1.8}, 'Demonic Iron':{'base':10000000,'multiplier':1.8}, 'bought':0}, 'quantity':1},},
-            6:{'Green Worker Slime':{'reward':self.g_w_slime,'cost':{'Essence':self.costs['Green Worker Slime']['Essence'], 'bought':0},'quantity':20},
-               'Blue Worker Slime': {'reward':self.b_w_slime,'cost':{'Essence':self.costs['Blue Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Red Worker Slime': {'reward':self.r_w_slime,'cost':{'Essence':self.costs['Red Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Purple Worker Slime': {'reward':self.p_w_slime,'cost':{'Essence':self.costs['Purple Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Black Worker Slime': {'reward':self.bk_w_slime,'cost':{'Essence':self.costs['Black Worker Slime']['Essence'], 'bought':0},'quantity':10},
-               'Minor Demon': {'reward':self.minor_demon,'cost':{'Essence':self.costs['Minor Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon': {'reward':self.demon,'cost':{'Essence':self.costs['Demon']['Essence'], 'bought':0},'quantity':2},
-               'Major Demon': {'reward':self.major_demon,'cost':{'Essence':self.costs['Major Demon']['Essence'], 'bought':0},'quantity':2},
-               'Demon Overlord': {'reward':self.demon_overlord,'cost':{'Pure Essence':self.costs['Demon Overlord']['Pure Essence'], 'bought':0},'quantity':2},
-               },
-                        }
+        levels = {name: Descriptions(props, name, description) for name, description in economy.LEVELS.items()}
+        self.level_1_description, self.level_2_description, self.level_3_description, self.level_4_description, self.level_5_description, self.level_6_description = levels.values()
+
+        # Prices and stock are in economy.py, so balance.py plays the same shop
+        rewards = {template.name: template for template in [self.g_w_slime, self.b_w_slime, self.r_w_slime, self.p_w_slime, self.bk_w_slime,
+                                                              self.minor_demon, self.demon, self.major_demon, self.demon_overlord]}
+        rewards.update(levels)
+        self.costs = economy.COSTS
+        self.recipes = economy.make_recipes(rewards)
                         
         
         self.level = 0
+        self.bulk_modes = [1, 10, 100, 'max']
+        self.bulk = 1  # How many one click summons, or as many as can be afforded
+        self.shop_entries = {}  # (level, recipe name): what the shop shows for it, see shop_entry
+        self.shop_version = None  # Resource ledger version the shop's affordability was last worked out for
+        self.shop_buttons = None  # Exit and bulk mode, made again when the mode changes
 
     def update_recipes(self):
-        for name, recipe_data in self.recipes[self.level-1].items():
-            if name in self.recipes[self.level].keys():
-                self.recipes[self.level][name]['quantity'] += recipe_data['quantity']
-                self.recipes[self.level][name]['cost']['bought'] = recipe_data['cost']['bought']
+        economy.carry_over(self.recipes, self.level)
+
+    def batch_size(self, recipe_data):
+        # Summons one click buys in the current bulk mode, capped by the portal's stock.
+        # At least 1 so there is always a price to show
+        if self.bulk == 'max':
+            return max(1, economy.max_affordable(self.props.resource_quantities, recipe_data['cost'], recipe_data['quantity']))
+        return max(1, min(self.bulk, recipe_data['quantity']))
+
+    def shop_entry(self, recipe_name, recipe_data, button_rect, resources_changed):
+        # A recipe's price, its rendered name and cost and its button. The price and text are
+        # only worked out again when its bought count, its stock or the batch size changes,
+        # and whether it can be afforded only when those or the resources do
+        key = (self.level, recipe_name)
+        entry = self.shop_entries.get(key)
+        state = (recipe_data['cost']['bought'], recipe_data['quantity'])
+        if entry is not None and entry['state'] == state and not resources_changed:
+            return entry
+
+        count = self.batch_size(recipe_data) if recipe_name != 'Upgrade Portal' else 1
+        if entry is None or entry['state'] != state or entry['count'] != count:
+            price = economy.price(recipe_data['cost'], count)
+            cost_texts = [f'{cost}: {format_large_number(value)}' for cost, value in price.items()]
+            cost_label = "Cost" if count == 1 else f"Cost for {count}"
+            cost_lines = [f"{cost_label}: {', '.join(cost_texts[:3])}"]
+            if len(cost_texts) > 3:
+                cost_lines.append(', '.join(cost_texts[3:]))
+
+            if recipe_name == 'Upgrade Portal':
+                button = Button(self.props, "Upgrade",self,{'upgrade':recipe_data}, button_rect, (200,0,0),
+                                background_box = True, outline = True, tooltip = 'Insufficient Resources')
+            elif recipe_data['quantity'] > 0:
+                button = Button(self.props, "Summon",self,{'summon':recipe_data}, button_rect, (200,0,0),
+                                background_box = True, outline = True, tooltip = 'Insufficient Resources')
+            else:
+                button = Button(self.props, "Portal Limited", self, {'summon':recipe_data}, button_rect, (200,0,0),
+                                background_box = True, outline = True, activated = False, tooltip = 'Upgrade your portal to summon more')
+
+            entry = {'state':state, 'count':count, 'price':price, 'button':button,
+                     'name':text_cache.render(self.props.font, recipe_name, True, (0,0,0)),
+                     'cost':[text_cache.render(self.props.font_small, line, True, (0,0,0)) for line in cost_lines]}
+            self.shop_entries[key] = entry
 
+        if recipe_name == 'Upgrade Portal' or recipe_data['quantity'] > 0:
+            quantities = self.props.resource_quantities
+            entry['button'].activated = all(amount <= quantities[resource] for resource, amount in entry['price'].items())
+        return entry
 
     def render(self):    
         # Draw a box in the middle of the screen for the shop interface
@@ -391,11 +319,18 @@ class PortalSummoning:
         shop_box_y = (800 - shop_box_height) // 2
         pygame.draw.rect(self.props.screen, (200, 200, 200), (shop_box_x, shop_box_y, shop_box_width, shop_box_height))
 
+        # The shop's text, prices and buttons are kept between frames, see shop_entry
+        resources_changed = self.props.resource_quantities.version != self.shop_version
+        self.shop_version = self.props.resource_quantities.version
+
         # Draw the 'x' button to exit the shop
-        exit_button_x = shop_box_x + shop_box_width - 150
-        exit_button_y = shop_box_y
-        exit = Button(self.props, "Exit",self.props,'game', pygame.Rect(exit_button_x, exit_button_y, 150, 50), (200,200,200), background_box = False, outline = True)
-        self.buttons = ButtonGroup(self.props, [exit])
+        if self.shop_buttons is None:
+            exit_button_x = shop_box_x + shop_box_width - 150
+            exit_button_y = shop_box_y
+            exit = Button(self.props, "Exit",self.props,'game', pygame.Rect(exit_button_x, exit_button_y, 150, 50), (200,200,200), background_box = False, outline = True)
+            bulk = Button(self.props, "Buy max" if self.bulk == 'max' else f"Buy x{self.bulk}", self, {'bulk':None}, pygame.Rect(shop_box_x, shop_box_y, 150, 50), (200,200,200), background_box = False, outline = True)
+            self.shop_buttons = [exit, bulk]
+        self.buttons = ButtonGroup(self.props, list(self.shop_buttons))
 
         
 
@@ -403,52 +338,19 @@ class PortalSummoning:
         recipe_y = shop_box_y + 50
         self.reward_description_text = None
         for recipe_name, recipe_data in self.recipes[self.level].items():
-            # Render recipe name
-            recipe_font = self.props.font
-            recipe_text = recipe_font.render(recipe_name, True, (0,0,0))
-            self.props.screen.blit(recipe_text, (shop_box_x + 20, recipe_y))
             recipe_data['name'] = recipe_name
+            entry = self.shop_entry(recipe_name, recipe_data, pygame.Rect(shop_box_x + 300, recipe_y, 100, 50), resources_changed)
 
-            # Render recipe cost
-            cost_texts = []
-            for cost, value in recipe_data['cost'].items():
-                if cost != 'bought':
-                    cost_texts.append(f'{cost}: {format_large_number(round(value['base']*value['multiplier']**recipe_data['cost']['bought']))}')
-            
-            if len(cost_texts) <=3:
-                cost_text = f"Cost: {', '.join(cost_texts)}"
-                cost_font = self.props.font_small
-                cost_text_render = cost_font.render(cost_text, True, (0,0,0))
-                self.props.screen.blit(cost_text_render, (shop_box_x + 20, recipe_y + 30))
-            else:
-                cost_text = f"Cost: {', '.join(cost_texts[:3])}"
-                cost_font = self.props.font_small
-                cost_text_render = cost_font.render(cost_text, True, (0,0,0))
-                self.props.screen.blit(cost_text_render, (shop_box_x + 20, recipe_y + 30))
-                cost_text1 = ', '.join(cost_texts[3:])
-                cost_text_render1 = cost_font.render(cost_text1, True, (0,0,0))
-                self.props.screen.blit(cost_text_render1, (shop_box_x + 20, recipe_y + 44))
-
+            # Render recipe name and cost
+            self.props.screen.blit(entry['name'], (shop_box_x + 20, recipe_y))
+            for i, cost_text_render in enumerate(entry['cost']):
+                self.props.screen.blit(cost_text_render, (shop_box_x + 20, recipe_y + 30 + 14*i))
 
             if recipe_name != 'Upgrade Portal':
                 recipe_data['reward'].position = (shop_box_x +240, recipe_y)
                 recipe_data['reward'].fixed_point = True
                 recipe_data['reward'].fixed_size = True
-                if recipe_data['quantity'] > 0:
-                    self.buttons.buttons.append(
-                        Button(self.props, "Summon",self,{'summon':recipe_data}, 
-                            pygame.Rect(shop_box_x + 300, recipe_y, 100, 50), (200,0,0), 
-                            background_box = True, outline = True, activated = self.props.can_buy(recipe_data['cost']), tooltip = 'Insufficient Resources'))
-                else:
-                    self.buttons.buttons.append(
-                        Button(self.props, "Portal Limited", self, {'summon':recipe_data}, 
-                            pygame.Rect(shop_box_x + 300, recipe_y, 100, 50), (200,0,0), 
-                            background_box = True, outline = True, activated = False, tooltip = 'Upgrade your portal to summon more'))
-            else:
-                self.buttons.buttons.append(
-                        Button(self.props, "Upgrade",self,{'upgrade':recipe_data}, 
-                            pygame.Rect(shop_box_x + 300, recipe_y, 100, 50), (200,0,0), 
-                            background_box = True, outline = True, activated = self.props.can_buy(recipe_data['cost']), tooltip = 'Insufficient Resources'))
+            self.buttons.buttons.append(entry['button'])
 
             recipe_data['reward'].render()
 
@@ -456,8 +358,7 @@ class PortalSummoning:
             mouse_x, mouse_y = pygame.mouse.get_pos()
             if shop_box_x + 20 <= mouse_x <= shop_box_x + 20 + 200 and recipe_y <= mouse_y <= recipe_y + 50:
                 # Render pop-out box with reward description
-                reward_description_font = self.props.font_small
-                self.reward_description_text = reward_description_font.render(recipe_data['reward'].description, True, (0,0,0))
+                self.reward_description_text = text_cache.render(self.props.font_small, recipe_data['reward'].description, True, (0,0,0))
                 
                 
 
@@ -473,30 +374,34 @@ class PortalSummoning:
 
     def trigger(self, event):
         if 'summon' in event:
-            self.props.pay(event['summon']['cost'])
-            reward = event['summon']['reward'].copy()
-            reward.position = (0,3)
-            self.recipes[self.level][event['summon']['name']]['quantity'] -= 1
-            self.recipes[self.level][event['summon']['name']]['cost']['bought'] += 1
-            if isinstance(reward,Gatherer):
-                reward.update_stats()
-                self.props.gatherers.append(reward)
-                self.props.selected_gatherer = reward
-                if self.recipes[self.level][event['summon']['name']]['cost']['bought'] == 1:
+            count = self.batch_size(event['summon'])
+            bought = event['summon']['cost']['bought']
+            economy.buy(self.props.resource_quantities, event['summon'], count)
+            rewards = [event['summon']['reward'].copy() for i in range(count)]
+            for reward in rewards:
+                reward.position = (0,3)
+            if isinstance(rewards[0],Gatherer):
+                for reward in rewards:
+                    self.props.simulation.add_gatherer(reward)
+                self.props.selected_gatherer = rewards[0]
+                if bought == 0:
                     self.props.tooltip = "Click a resource for your slime to gather"
                     self.props.tooltip_ticks = 120
-                if self.recipes[self.level][event['summon']['name']]['cost']['bought'] == 2:
+                if bought == 1:
                     self.props.tooltip = ["You can change what your slime is gathering",
                                             "by clicking the slime then a new resource"]
                     self.props.tooltip_ticks = 120
-            elif isinstance(reward,TaskMaster):
-                self.props.task_masters.append(reward)
-                self.props.calculate_bonuses()
+            elif isinstance(rewards[0],TaskMaster):
+                self.props.simulation.add_task_masters(rewards)
             self.summon_sound.set_volume(self.props.effects_volume / 100)
             self.summon_sound.play()
             
 
             self.props.state = 'game'
+        if 'bulk' in event:
+            self.bulk = self.bulk_modes[(self.bulk_modes.index(self.bulk) + 1) % len(self.bulk_modes)]
+            self.shop_entries = {}
+            self.shop_buttons = None
         if 'upgrade' in event:
             self.props.pay(event['upgrade']['cost'])
             self.level += 1
@@ -515,7 +420,7 @@ class PortalSummoning:
 
 class Game:
     
-    def __init__(self):
+    def __init__(self, warp = 1):
         self.state = 'start menu'
         self.game_states = ['start menu', 'game', 'portal']
         
@@ -527,9 +432,18 @@ class Game:
         self.center_y = self.height // 2
         self.clock = pygame.time.Clock()
         self.screen = pygame.display.set_mode((self.width, self.height))
+        # Only what changed is sent to the display, see render
+        self.dirty_rects = DirtyRects(self.screen)
+        self.layer = Layer(self.screen, self.dirty_rects)
+        self.composing = False  # Whether draw() goes to the layer
+        self.world_drawn = None  # Camera and chunks the layer's background was drawn for
+        self.screen_drawn = None  # What the last menu or shop frame was drawn for
         self.font = pygame.font.Font('Fondamento-Regular.ttf', 24)
         self.font_small = pygame.font.Font('Fondamento-Regular.ttf', 12)
         self.font_large = pygame.font.Font('Fondamento-Regular.ttf', 80)
+        self.sprite_cache = SpriteCache()
+        self.text_cache = text_cache
+        self.deposit_sprites = {}
         self.volume = 20
         self.effects_volume = 10
 
@@ -545,22 +459,24 @@ class Game:
         self.selected_tile = None
         self.selected_gatherer = None
 
-        self.assignments = {}
-        self.gatherers = []
-        self.task_masters = []
 
         # Constants
         self.GRID_SIZE = 1000
         self.TILE_SIZE = 16
-        self.CHUNK_SIZE = 16
-        self.RESOURCE_PROBABILITY = 0.005
-        self.SEED = 12345
-        self.chunks = {(0,0):{(0,0):None}}
+        self.CHUNK_SIZE = world.CHUNK_SIZE
+        self.RESOURCE_PROBABILITY = world.RESOURCE_PROBABILITY
+        self.SEED = world.SEED
+        self.chunks = {world.PORTAL_CHUNK:world.Chunk(*world.PORTAL_CHUNK, self.CHUNK_SIZE)}
+        self.CHUNK_LOAD_MARGIN = 2  # Chunks past the edge of the screen that are generated ahead of the camera
+        self.CHUNK_SURFACE_BUDGET = 64 * 1024 * 1024  # Bytes of pre-rendered chunk surfaces kept around
+        self.MAX_RESIDENT_CHUNKS = 4096  # Chunks kept in memory, far away ones are unloaded and read back from disk
+        self.chunk_residency = world.ChunkResidency(self.MAX_RESIDENT_CHUNKS)
+        self.chunk_surfaces = ChunkSurfaceCache(self.rasterize_chunk, self.CHUNK_SURFACE_BUDGET)
         self.border_thickness = 3
         self.manual_gathering = 1
 
         self.tooltip = "Click on the green cystals to gather essence"
-        self.tooltip_ticks = 6000
+        self.tooltip_ticks = 6000  # How long the tooltip has left, in 50ths of a real second
         
         self.player_x, self.player_y = self.width//2, self.height//2  # Player position
 
@@ -569,30 +485,6 @@ class Game:
         # Set seed for randomization
         random.seed(self.SEED)
 
-        self.nearby_resources = {
-            "Essence":2,
-            "Wood":1,
-        }
-
-        self.range1_resources = {
-            "Essence":3,
-            "Iron":2,
-            "Wood":1,
-            "Gold":1
-        }
-
-        self.range2_resources = {
-            "Rubies":3,
-            "Essence":2,
-            "Demonic Iron":1,
-        }
-
-        self.range3_resources = {
-            "Demonic Iron":2,
-            "Pure Essence":2,
-            "Rubies":1
-        }
-
         self.resource_colors = {
             "Essence":(0,255,0),
             "Wood":(139,69,19),
@@ -603,15 +495,13 @@ class Game:
             "Pure Essence":(200,255,200),
         }
 
-        self.resource_quantities = {
-            "Essence":0,
-            "Wood":0,
-            "Gold":0,
-            "Iron":0,
-            "Rubies":0,
-            "Demonic Iron":0,
-            "Pure Essence":0,
-        }
+        # Chunks store resources by id, 0 being an empty tile
+        self.resource_names = [None] + list(self.resource_colors)
+        self.resource_ids = {name: resource_id for resource_id, name in enumerate(self.resource_names) if name}
+
+        # Gatherers, task masters, resources and bonuses live in the simulation, see the properties below
+        self.simulation = Simulation(self.resource_colors, clock = RealClock(warp), seed = self.SEED)
+        self.tooltip_time = pygame.time.get_ticks()  # Milliseconds, when the tooltip countdown was last brought up to date
 
         self.manual_resource_gathering = {
             "Essence":True,
@@ -635,20 +525,23 @@ class Game:
             "Pure Essence":{'tile':sheet.image_at((384,0,64,64)),'item':sheet.image_at((384,64,64,64))},
         }
 
+        self.portal_sprites = spritesheet('PortalResource-Sheet.png').images_at([(level*112,0,112,112) for level in range(7)])
+
         self.unlocked_resources = ["Essence"]
+        self.hud_resources = ["Essence"]  # Unlocked resources in the order the HUD lists them
+        self.hud_texts = {}  # Resource: its rendered count, dropped when the count changes
+        self.resource_quantities.subscribe(self.resource_changed)
+
+        # Map a pick from 1 to 100 to a resource id for each distance band
+        self.resource_mappings = economy.resource_mappings(random, self.resource_ids)
 
-        # Generate a mapping of random integers to resources
-        self.nearby_resource_mapping = {}
-        self.range1_resouce_mapping = {}
-        self.range2_resouce_mapping = {}
-        self.range3_resouce_mapping = {}
+        # Explored chunks are kept on disk so they are loaded instead of generated again
+        self.WORLD_DIRECTORY = os.path.join('Worlds', str(self.SEED))
+        self.region_store = world.RegionStore(self.WORLD_DIRECTORY, self.CHUNK_SIZE)
 
-        for i in range(1, 101):
-            # Assign resources based on probabilities
-            self.nearby_resource_mapping[i] = random.choices(list(self.nearby_resources.keys()),list(self.nearby_resources.values()), k=1)[0]
-            self.range1_resouce_mapping[i] = random.choices(list(self.range1_resources.keys()),list(self.range1_resources.values()), k=1)[0]
-            self.range2_resouce_mapping[i] = random.choices(list(self.range2_resources.keys()),list(self.range2_resources.values()), k=1)[0]
-            self.range3_resouce_mapping[i] = random.choices(list(self.range3_resources.keys()),list(self.range3_resources.values()), k=1)[0]
+        # Start generating the area around the portal while the player is still in the menu
+        self.chunk_streamer = world.ChunkStreamer(self.SEED, self.CHUNK_SIZE, self.RESOURCE_PROBABILITY, self.resource_mappings)
+        self.load_chunks_near_camera()
 
 
         # Define central summoning portal
@@ -658,100 +551,184 @@ class Game:
         self.death_menu = DeathMenu(self)
         self.overlay = Overlay(self)
 
-        self.base_bonuses = {'max_capacity':{'additive':0,'multiplicative':1},
-                        'gathering_speed':{'additive':0,'multiplicative':1},
-                        'moving_speed':{'additive':0,'multiplicative':1},}
-        self.bonuses = {'max_capacity':{'additive':0,'multiplicative':1},
-                        'gathering_speed':{'additive':0,'multiplicative':1},
-                        'moving_speed':{'additive':0,'multiplicative':1},}
-
-    def calculate_bonuses(self):
-        self.bonuses = self.base_bonuses
-        for task_master in self.task_masters:
-            for effect, change in task_master.effect.items():
-                if change['method'] == 'additive':
-                    self.bonuses[effect]['additive'] += change['magnitude']
-                elif change['method'] == 'multiplicative':
-                    self.bonuses[effect]['multiplicative'] *= change['magnitude']
-        print(self.bonuses)
-        for gatherer in self.gatherers:
-            gatherer.update_stats()
-
-    def can_buy(self,costs):
-        for resource, cost in costs.items():
-            if resource != 'bought':
-                total_cost = round(cost['base']*cost['multiplier']**costs['bought'])
-                if total_cost > self.resource_quantities[resource]:
-                    return False
-        return True
+    @property
+    def gatherers(self):
+        return self.simulation.gatherers
+
+    @property
+    def task_masters(self):
+        return self.simulation.task_masters
+
+    @property
+    def assignments(self):
+        return self.simulation.assignments
+
+    @property
+    def resource_quantities(self):
+        return self.simulation.resource_quantities
+
+    @property
+    def bonuses(self):
+        return self.simulation.bonuses
+
+    def resource_changed(self, resource, old, new):
+        # Called by the resource ledger, a resource shows up in the HUD the first time there is any
+        self.hud_texts.pop(resource, None)
+        if new > 0 and resource not in self.unlocked_resources:
+            self.unlocked_resources.append(resource)
+            self.hud_resources = [resource for resource in self.resource_sprites if resource in self.unlocked_resources]
+
+    def can_buy(self,costs, count = 1):
+        return economy.can_buy(self.resource_quantities, costs, count)
     
-    def pay(self,costs):
-        for resource, cost in costs.items():
-            if resource != 'bought':
-                total_cost = round(cost['base']*cost['multiplier']**costs['bought'])
-                self.resource_quantities[resource] -= total_cost
-
-    def generate_chunk(self, chunk_x, chunk_y):
-        print(chunk_x,chunk_y)
-        chunk = {}
-        for x in range(chunk_x * self.CHUNK_SIZE, (chunk_x + 1) * self.CHUNK_SIZE):
-            for y in range(chunk_y * self.CHUNK_SIZE, (chunk_y + 1) * self.CHUNK_SIZE):
-                if random.random() < self.RESOURCE_PROBABILITY:
-                    # Check neighboring tiles to determine resource span
-                    span_x = random.randint(1, 5)  # Random span along x-axis
-                    span_y = random.randint(1, 5)  # Random span along y-axis
-                    if abs(chunk_x)+abs(chunk_y)<=2:
-                        resource = self.nearby_resource_mapping[random.randint(1, 100)]  # Resource complexity levels
-                    elif abs(chunk_x)+abs(chunk_y)<=4:
-                        resource = self.range1_resouce_mapping[random.randint(1, 100)]  # Resource complexity levels
-                    elif abs(chunk_x)+abs(chunk_y)<=6:
-                        resource = self.range2_resouce_mapping[random.randint(1, 100)]  # Resource complexity levels
-                    else:
-                        resource = self.range3_resouce_mapping[random.randint(1, 100)]  # Resource complexity levels
-                    for i in range(span_x):
-                        for j in range(span_y):
-                            # Check if the neighboring tile is within the grid bounds
-                            if chunk_x * self.CHUNK_SIZE <= x + i < (chunk_x + 1) * self.CHUNK_SIZE and chunk_y * self.CHUNK_SIZE <= y + j < (chunk_y + 1) * self.CHUNK_SIZE:
-                                chunk[(x+i, y+j)] = resource
-        return chunk
+    def pay(self,costs, count = 1):
+        economy.pay(self.resource_quantities, costs, count)
+
+    def generate_chunks(self, coords):
+        return world.generate_chunks(self.SEED, coords, self.CHUNK_SIZE, self.RESOURCE_PROBABILITY, self.resource_mappings)
+
+    def deposit_at(self, tile):
+        # Id (chunk_x, chunk_y, index) of the deposit covering a tile, or None
+        chunk = self.chunks.get((tile[0] // self.CHUNK_SIZE, tile[1] // self.CHUNK_SIZE))
+        if chunk:
+            i = chunk.deposit_at(*tile)
+            if i is not None:
+                return (chunk.x, chunk.y, i)
+        return None
+
+    def deposit_resource(self, deposit_id):
+        chunk = self.chunks.get(deposit_id[:2])
+        if chunk and deposit_id[2] < len(chunk.deposits):
+            return self.resource_names[chunk.deposits[deposit_id[2]][4]]
+        return None
+
+    def portal_rect(self):
+        # The Main Portal covers 7x7 tiles centred on the origin
+        size = round(112/16*self.TILE_SIZE)
+        return pygame.Rect(self.player_x - round(56/16*self.TILE_SIZE), self.player_y - round(56/16*self.TILE_SIZE), size, size)
+
+    def pick_tile(self, pos):
+        # [deposit id, tile screen rect, resource, (x, y)] of whatever is under a screen position, or None
+        portal_rect = self.portal_rect()
+        if portal_rect.collidepoint(pos):
+            return [(0,0), portal_rect, "Main Portal", (0,0)]
+        x = (pos[0] - self.player_x) // self.TILE_SIZE
+        y = (pos[1] - self.player_y) // self.TILE_SIZE
+        deposit_id = self.deposit_at((x, y))
+        if deposit_id:
+            return [deposit_id, pygame.Rect(x * self.TILE_SIZE + self.player_x, y * self.TILE_SIZE + self.player_y, self.TILE_SIZE, self.TILE_SIZE), self.deposit_resource(deposit_id), (x,y)]
+        return None
+
+    def visible_chunk_range(self, margin = 0):
+        # Chunk coordinates (inclusive) of every chunk overlapping the screen
+        chunk_pixels = self.CHUNK_SIZE * self.TILE_SIZE
+        min_x = (-self.TILE_SIZE - self.player_x) // chunk_pixels - margin
+        max_x = (self.width - self.player_x) // chunk_pixels + margin
+        min_y = (-self.TILE_SIZE - self.player_y) // chunk_pixels - margin
+        max_y = (self.height - self.player_y) // chunk_pixels + margin
+        return min_x, max_x, min_y, max_y
+
+    def load_chunks_near_camera(self):
+        # Load chunks the camera is getting close to from disk, queue generation of
+        # the ones never saved, nearest first, and pick up the ones finished since the last frame
+        min_x, max_x, min_y, max_y = self.visible_chunk_range(self.CHUNK_LOAD_MARGIN)
+        center_x, center_y = (min_x + max_x) / 2, (min_y + max_y) / 2
+        missing = []
+        for x in range(min_x, max_x + 1):
+            for y in range(min_y, max_y + 1):
+                if (x, y) in self.chunks:
+                    self.chunk_residency.touch((x, y))
+                    continue
+                if (x, y) in self.chunk_streamer.pending:
+                    continue
+                chunk = self.region_store.load(x, y)
+                if chunk is not None:
+                    self.chunks[(x, y)] = chunk
+                    self.chunk_residency.touch((x, y))
+                else:
+                    missing.append((x, y))
+        missing.sort(key = lambda chunk: abs(chunk[0] - center_x) + abs(chunk[1] - center_y))
+        self.chunk_streamer.request(missing)
+        for coord, chunk in self.chunk_streamer.collect().items():
+            self.chunks[coord] = chunk
+            self.chunk_residency.touch(coord)  # Or it would look unused and be the first to be unloaded again
+            self.region_store.save(chunk)
+        self.unload_far_chunks((center_x, center_y))
+        self.chunk_residency.next_frame()
+
+    def unload_far_chunks(self, center):
+        if not self.chunk_residency.over_budget(self.chunks):
+            return
+        # Chunks with a gatherer assigned stay loaded, as does the cleared portal chunk
+        pinned = {deposit_id[:2] for deposit_id in self.assignments}
+        pinned.add(world.PORTAL_CHUNK)
+        evicted = self.chunk_residency.evict(self.chunks, pinned, center)
+        for coord in evicted:
+            del self.chunks[coord]  # Already saved when it was generated
+        self.chunk_surfaces.invalidate(evicted)
     
+    def draw(self, surface, position):
+        # Blit to the screen, or to the layer while the game view is being put together
+        if self.composing:
+            self.layer.blit(surface, position)
+        else:
+            self.screen.blit(surface, position)
+
+    def world_view(self):
+        # Everything the world under the sprites is drawn from, when it changes the whole screen is redrawn
+        min_x, max_x, min_y, max_y = self.visible_chunk_range()
+        chunks = tuple((x, y) in self.chunks for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1))
+        return (self.player_x, self.player_y, self.TILE_SIZE, self.main_portal.level, chunks)
+
     def render(self):
-        self.screen.fill((0,0,0))
         if self.state == 'game':
-            self.render_grid()
+            # The world is drawn to the layer's background when the camera moves, the
+            # zoom changes or chunks come in. The sprites, HUD and tooltip go on the
+            # layer, which only redraws and updates the parts of the screen that changed
+            if self.screen_drawn is not None:
+                self.screen_drawn = None
+                self.layer.invalidate()
+            world_view = self.world_view()
+            if world_view != self.world_drawn:
+                self.world_drawn = world_view
+                self.layer.background.fill((0,0,0))
+                self.render_grid(self.layer.background)
+                self.layer.invalidate()
+            self.composing = True
             for gatherer in self.gatherers:
                 gatherer.render()
             for task_master in self.task_masters:
                 task_master.render()
             
-            i=0
-            
-            for resource,sprites in self.resource_sprites.items():
-                if (self.resource_quantities[resource] > 0) and (resource not in self.unlocked_resources):
-                    self.unlocked_resources.append(resource)
-                if resource in self.unlocked_resources:
-                    self.screen.blit(pygame.transform.scale(sprites['item'],(32,32)), (20,20+32*i,32,32))
-                    self.screen.blit(self.font.render(format_large_number(self.resource_quantities[resource]), False, (255, 255, 255)), (54,20+32*i,32,32))
-                    if pygame.Rect(20,20+32*i,64,32).collidepoint(pygame.mouse.get_pos()):
-                        # Render pop-out box with reward description
-                        self.tooltip = resource
-                        self.tooltip_ticks = 30
-                    i+=1
+            for i, resource in enumerate(self.hud_resources):
+                text = self.hud_texts.get(resource)
+                if text is None:
+                    text = self.hud_texts[resource] = text_cache.render(self.font, format_large_number(self.resource_quantities[resource]), False, (255, 255, 255))
+                self.draw(self.sprite_cache.scale(self.resource_sprites[resource]['item'],(32,32)), (20,20+32*i))
+                self.draw(text, (54,20+32*i))
+                if pygame.Rect(20,20+32*i,64,32).collidepoint(pygame.mouse.get_pos()):
+                    # Render pop-out box with reward description
+                    self.tooltip = resource
+                    self.tooltip_ticks = 30
+
+            self.render_tooltip()
+            self.composing = False
+            self.layer.present()
+            return
+
+        # Menus and the shop are drawn whole, but only when something they show could have changed
+        self.world_drawn = None
+        tooltip = self.tooltip if self.tooltip_ticks else None
+        screen_view = (self.state, self.start_menu.state, pygame.mouse.get_pos(), pygame.mouse.get_pressed(), str(tooltip),
+                       self.main_portal.level, self.main_portal.bulk, self.resource_quantities.version if self.state == 'portal' else None)
+        if screen_view == self.screen_drawn:
+            self.render_tooltip(draw = False)
+            self.dirty_rects.present()
+            return
+        self.screen_drawn = screen_view
 
-        if self.tooltip_ticks:
-            x,y = pygame.mouse.get_pos()
-            if isinstance(self.tooltip, str):
-                self.screen.blit(self.font_small.render(self.tooltip, False, (255,255,255)),(x+5,y-10))
-            else:
-                for count, tip in enumerate(self.tooltip):
-                    self.screen.blit(self.font_small.render(tip, False, (255,255,255)),(x+10,y-10+count*20))
-            self.tooltip_ticks -= 1
-        elif self.tooltip == "Right click on any object to get information about it":
-            self.tooltip = "You can summon entities in the central portal"
-        elif (abs(self.player_x)+abs(self.player_y) > 1500) & (self.tooltip != "You can press the C key to return to the center of the map"):
-            self.tooltip = "You can press the C key to return to the center of the map"
-            self.tooltip_ticks = 180
-            
+        self.screen.fill((0,0,0))
+        self.render_tooltip()
 
         if self.state == 'start menu':
             self.screen.fill((0,0,0))
@@ -763,30 +740,74 @@ class Game:
         if self.state == 'death':
             self.death_menu.render()
             
-        pygame.display.flip()
-
-    def render_grid(self):
-        # Calculate the top-left corner of the visible area
-        self.visible_rects = []
-
-        for chunk in self.chunks.values():
-            for (x, y), resource in chunk.items():
-                if resource:
-                    screen_x = x * self.TILE_SIZE + self.player_x
-                    screen_y = y * self.TILE_SIZE + self.player_y
-                    if -self.TILE_SIZE <= screen_x < self.width and -self.TILE_SIZE <= screen_y < self.height:
-                        color = (255, 255, 255)  # Default color
-                        rect = [(x,y),pygame.Rect(screen_x, screen_y, self.TILE_SIZE, self.TILE_SIZE), resource]
-                        self.visible_rects.append(rect)
-                        self.screen.blit(pygame.transform.scale(self.resource_sprites[resource]['tile'],(self.TILE_SIZE, self.TILE_SIZE)), rect[1])
-        screen_x = self.player_x - round(56/16*self.TILE_SIZE)
-        screen_y = self.player_y -round(56/16*self.TILE_SIZE)
-        if -self.TILE_SIZE <= screen_x < self.width and -self.TILE_SIZE <= screen_y < self.height:
-            rect = [(0,0),pygame.Rect(screen_x, screen_y, round(112/16*self.TILE_SIZE),round(112/16*self.TILE_SIZE)), "Main Portal"]
-            self.visible_rects.append(rect)
-            sheet = spritesheet('PortalResource-Sheet.png')
-            current_portal = sheet.image_at((self.main_portal.level*112,0,112,112))
-            self.screen.blit(pygame.transform.scale(current_portal,(112/16*self.TILE_SIZE, 112/16*self.TILE_SIZE)), (screen_x,screen_y))
+        self.dirty_rects.invalidate()
+        self.dirty_rects.present()
+
+    def tooltip_text(self, text):
+        return text_cache.render(self.font_small, text, False, (255,255,255))
+
+    def render_tooltip(self, draw = True):
+        # Tooltips count down in real time, not simulation time, so they last as long at
+        # any frame rate or warp and in the menus. draw is False on frames that aren't drawn,
+        # the countdown still goes on
+        now = pygame.time.get_ticks()
+        ticks, self.tooltip_time = (now - self.tooltip_time) * TICK_RATE / 1000, now
+        if self.tooltip_ticks:
+            x,y = pygame.mouse.get_pos()
+            if draw and isinstance(self.tooltip, str):
+                self.draw(self.tooltip_text(self.tooltip),(x+5,y-10))
+            elif draw:
+                for count, tip in enumerate(self.tooltip):
+                    self.draw(self.tooltip_text(tip),(x+10,y-10+count*20))
+            self.tooltip_ticks = max(0, self.tooltip_ticks - ticks)
+        elif self.tooltip == "Right click on any object to get information about it":
+            self.tooltip = "You can summon entities in the central portal"
+        elif (abs(self.player_x)+abs(self.player_y) > 1500) & (self.tooltip != "You can press the C key to return to the center of the map"):
+            self.tooltip = "You can press the C key to return to the center of the map"
+            self.tooltip_ticks = 180
+
+    def deposit_sprite(self, resource_id, width, height):
+        # A resource's tile repeated over a width x height deposit, built once per shape
+        key = (resource_id, width, height)
+        sprite = self.deposit_sprites.get(key)
+        if sprite is None:
+            tile = self.resource_sprites[self.resource_names[resource_id]]['tile']
+            sprite = pygame.Surface((tile.get_width() * width, tile.get_height() * height), pygame.SRCALPHA)
+            for x in range(width):
+                for y in range(height):
+                    sprite.blit(tile, (x * tile.get_width(), y * tile.get_height()))
+            self.deposit_sprites[key] = sprite
+        return sprite
+
+    def rasterize_chunk(self, chunk, tile_size):
+        # Draw every deposit of a chunk onto its own surface at the given zoom, one blit each
+        surface = pygame.Surface((self.CHUNK_SIZE * tile_size, self.CHUNK_SIZE * tile_size), pygame.SRCALPHA).convert_alpha()
+        for x, y, width, height, resource_id in chunk.deposits:
+            rect = pygame.Rect((x - chunk.x * self.CHUNK_SIZE) * tile_size, (y - chunk.y * self.CHUNK_SIZE) * tile_size, width * tile_size, height * tile_size)
+            surface.fill((0, 0, 0, 0), rect)  # A deposit replaces whatever earlier deposit it overlaps
+            surface.blit(self.sprite_cache.scale(self.deposit_sprite(resource_id, width, height), rect.size), rect)
+        # Chunks are mostly empty, run-length encoding lets blits skip the transparent runs
+        surface.set_alpha(255, pygame.RLEACCEL)
+        return surface
+
+    def render_grid(self, screen):
+        # Only the chunks overlapping the screen are drawn
+        self.chunk_surfaces.next_frame()
+        chunk_pixels = self.CHUNK_SIZE * self.TILE_SIZE
+        min_x, max_x, min_y, max_y = self.visible_chunk_range()
+        for chunk_x in range(min_x, max_x + 1):
+            for chunk_y in range(min_y, max_y + 1):
+                chunk = self.chunks.get((chunk_x, chunk_y))
+                if chunk is None:
+                    # Placeholder for chunks that are still being generated
+                    pygame.draw.rect(screen, (25, 25, 25), (chunk_x * chunk_pixels + self.player_x, chunk_y * chunk_pixels + self.player_y, chunk_pixels, chunk_pixels))
+                    continue
+                surface = self.chunk_surfaces.get(chunk, self.TILE_SIZE)
+                if surface:
+                    screen.blit(surface, (chunk_x * chunk_pixels + self.player_x, chunk_y * chunk_pixels + self.player_y))
+        portal_rect = self.portal_rect()
+        if portal_rect.colliderect(screen.get_rect()):
+            screen.blit(self.sprite_cache.scale(self.portal_sprites[self.main_portal.level],portal_rect.size), portal_rect)
 
 
     def trigger(self, event):
@@ -796,17 +817,18 @@ class Game:
             pygame.quit()
 
 
-async def main():
-    game = Game()
+async def main(warp = 1):
+    game = Game(warp)
 
     mining_sound = pygame.mixer.Sound("Mine.wav")
     
-    # Generate chunks around the player if they don't exist
-    for x in range(-32,33):
-        for y in range(-32,33):
-            if (x, y) not in game.chunks:
-                game.chunks[(x, y)] = game.generate_chunk(x, y)
-    
+    try:
+        await game_loop(game, mining_sound)
+    finally:
+        game.chunk_streamer.shutdown()
+        game.region_store.close()
+
+async def game_loop(game, mining_sound):
     terminated = False
     while not terminated:
         if game.state == 'game':
@@ -832,15 +854,13 @@ async def main():
                             print(game.selected_gatherer)
                         else:
 
-                            game.selected_tiles = [square for square in game.visible_rects if square[1].collidepoint(event.pos)]
-                            if game.selected_tiles:
-                                game.selected_tile = game.selected_tiles[0]
+                            game.selected_tile = game.pick_tile(event.pos)
+                            if game.selected_tile:
                                 print(game.selected_tile[2])
                                 if game.selected_tile[2] == 'Main Portal':
                                     game.trigger('portal')
                                 elif game.selected_gatherer != None:
                                     game.selected_gatherer.assign(game.selected_tile)
-                                    game.assignments[game.selected_tile[0]] = game.selected_gatherer
                                     
                                 else:
                                     if game.tooltip == "Click on the green cystals to gather essence":
@@ -849,14 +869,13 @@ async def main():
                                     mining_sound.set_volume(game.effects_volume / 100)
                                     mining_sound.play()
                             else:
-                                game.selected_tile = None
                                 game.selected_gatherer = None
                         
                     if event.button == 3:
                         print('click')
                         game.selected_taskmasters = [gatherer for gatherer in game.task_masters if gatherer.rect.collidepoint(event.pos)]
                         game.selected_gatherers = [gatherer for gatherer in game.gatherers if gatherer.rect.collidepoint(event.pos)]
-                        game.selected_tiles = [square for square in game.visible_rects if square[1].collidepoint(event.pos)]
+                        tile = game.pick_tile(event.pos)
                         if game.selected_gatherers:
                             game.tooltip = [game.selected_gatherers[0].name,
                                             f"Currently Gathering: {None if game.selected_gatherers[0].assignment == None else game.selected_gatherers[0].assignment[2]}",
@@ -870,8 +889,8 @@ async def main():
                             game.tooltip = [game.selected_taskmasters[0].name] + [f"Increases workers {name} by {value['magnitude']} {value['method']}" for name, value in game.selected_taskmasters[0].effect.items()]
                             game.tooltip_ticks = 60
                         
-                        elif game.selected_tiles:
-                            resource = game.selected_tiles[0][2]
+                        elif tile:
+                            resource = tile[2]
                             if resource == 'Essence':
                                 game.tooltip = f"This is a resource node for Essence it is used to summon new entities."
                             elif resource == 'Main Portal':
@@ -896,6 +915,9 @@ async def main():
                 game.player_y -= 5
             if keys[pygame.K_UP]:
                 game.player_y += 5
+
+            # Generate chunks around the player if they don't exist
+            game.load_chunks_near_camera()
             
 
             
@@ -925,8 +947,17 @@ async def main():
                     sys.exit()
                     
 
+        # Time only passes for the simulation in the game and while the shop is open
+        if game.state in ('game', 'portal'):
+            game.simulation.update()
+        else:
+            game.simulation.clock.elapsed()
         game.render()
         game.clock.tick(50)
         await asyncio.sleep(0)
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Dark Summoner's Forge")
+    parser.add_argument('--warp', type = float, default = 1, help = 'Run the game this many times faster than real time, e.g. 10, 100 or 1000')
+    args, _ = parser.parse_known_args()  # The web build may pass arguments of its own
+    asyncio.run(main(args.warp))
\ No newline at end of file
@@ -0,0 +1,632 @@
+import heapq
+import itertools
+import math
+import random
+import time
+from collections import Counter
+
+import numpy as np  # Required, like in world.py
+
+TICK_RATE = 50  # Simulation ticks per second, the frame rate the game was tuned at. Speeds are in tiles per tick
+TICK = 1 / TICK_RATE
+EPSILON = 1e-9  # Slack for comparing tick times, which pick up float error as they add up
+FAST_FORWARD_AFTER = 5  # Seconds of real time, a step longer than this (a backgrounded tab, a stalled frame) is fast forwarded instead of ticked through
+
+class RealClock:
+    # Real time, sped up by warp (10, 100, 1000... for soak testing the economy)
+
+    def __init__(self, warp = 1):
+        self.warp = warp
+        self.last = time.perf_counter()
+
+    def elapsed(self):
+        # Seconds passed since the last call
+        now = time.perf_counter()
+        seconds = (now - self.last) * self.warp
+        self.last = now
+        return seconds
+
+class ManualClock:
+    # Time that only passes when advance() is called, for runs that have to come out the same every time
+
+    def __init__(self, warp = 1):
+        self.warp = warp
+        self.pending = 0
+
+    def advance(self, seconds):
+        self.pending += seconds
+
+    def elapsed(self):
+        seconds = self.pending * self.warp
+        self.pending = 0
+        return seconds
+
+STATES = ('idle', 'gathering', 'drop off')
+IDLE, GATHERING, DROP_OFF = range(len(STATES))
+DIRECTIONS = ('down', 'up', 'left', 'right')
+DOWN, UP, LEFT, RIGHT = range(len(DIRECTIONS))  # update() relies on this order
+
+class Modifiers:
+    # Totals of the task masters' effects on gatherer stats, in the
+    # {stat: {'additive': total, 'multiplicative': total}} shape update_stats and
+    # apply_bonuses read. Summoning or dismissing a task master applies its
+    # effect as a change to the totals, and version goes up every time so
+    # anything that worked stats out from them can tell it is stale.
+
+    STATS = ('max_capacity', 'gathering_speed', 'moving_speed')
+
+    def __init__(self):
+        self.counts = {stat: {'additive': Counter(), 'multiplicative': Counter()} for stat in self.STATS}  # magnitude: how many task masters give it
+        self.bonuses = {stat: {'additive': 0, 'multiplicative': 1} for stat in self.STATS}
+        self.version = 0
+
+    def apply(self, effect, count = 1):
+        # count is how many task masters give the effect, negative to take them off
+        for stat, change in effect.items():
+            method, magnitude = change['method'], change['magnitude']
+            counts = self.counts[stat][method]
+            counts[magnitude] += count
+            if not counts[magnitude]:
+                del counts[magnitude]
+            # Totals are worked out from the counts rather than kept as running sums, so taking an effect off leaves no float error behind
+            if method == 'additive':
+                self.bonuses[stat][method] = sum(magnitude * count for magnitude, count in counts.items())
+            else:
+                self.bonuses[stat][method] = math.prod(magnitude ** count for magnitude, count in counts.items())
+        self.version += 1
+
+    def remove(self, effect):
+        self.apply(effect, -1)
+
+class ResourceLedger(dict):
+    # The resources brought back to the portal, a dict of resource: quantity that
+    # keeps track of its changes. Like Modifiers, version goes up whenever a quantity
+    # actually changes, and every subscriber is called with (resource, old, new),
+    # so the HUD and the shop only redo their work when something has changed.
+    # Quantities are only changed through item assignment (+=, -= and =)
+
+    def __init__(self, resources):
+        super().__init__((resource, 0) for resource in resources)
+        self.version = 0
+        self.subscribers = []
+
+    def __setitem__(self, resource, quantity):
+        old = self[resource]
+        if quantity == old:
+            return
+        super().__setitem__(resource, quantity)
+        self.version += 1
+        for subscriber in self.subscribers:
+            subscriber(resource, old, quantity)
+
+    def subscribe(self, subscriber):
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+class Trip:
+    # A walk in a straight line from start towards end at speed tiles a tick,
+    # setting off the tick after departure and stopping once within stop of
+    # the end, the way a GathererEngine leg walks. Positions along it are worked
+    # out when asked for instead of stepped every tick.
+
+    def __init__(self, start, end, departure, speed, stop = 0.5):
+        self.start = start
+        self.end = end
+        self.departure = departure
+        self.speed = speed
+        self.length = math.dist(start, end)
+        self.ticks = math.ceil((self.length - stop) / speed) if self.length > stop else 0
+        self.arrival = departure + self.ticks
+
+    def position(self, tick):
+        if not self.ticks:
+            return self.start
+        walked = min(min(max(tick - self.departure, 0), self.ticks) * self.speed, self.length) / self.length
+        return (self.start[0] + (self.end[0] - self.start[0]) * walked, self.start[1] + (self.end[1] - self.start[1]) * walked)
+
+class EngineField:
+    # A gatherer attribute that lives in the GathererEngine's arrays once the
+    # gatherer is added to it, and on the object itself before that (like the
+    # shop's templates). get and set convert between array values and the
+    # python values the rest of the game uses.
+
+    def __init__(self, array, get = None, set = None):
+        self.array = array
+        self.get = get or (lambda value: value.item())
+        self.set = set or (lambda value: value)
+
+    def __set_name__(self, owner, name):
+        self.name = '_' + name
+
+    def __get__(self, gatherer, owner = None):
+        if gatherer is None:
+            return self
+        if gatherer.engine is None:
+            return getattr(gatherer, self.name)
+        return self.get(getattr(gatherer.engine, self.array)[gatherer.index])
+
+    def __set__(self, gatherer, value):
+        if gatherer.engine is None:
+            setattr(gatherer, self.name, value)
+        else:
+            getattr(gatherer.engine, self.array)[gatherer.index] = self.set(value)
+
+class GathererModel:
+    # What the simulation needs of a gatherer, without anything to draw it with.
+    # main.Gatherer adds the sprites and the clicking, balance.py runs these as they are.
+    # Everything that changes while a gatherer works is kept in the simulation's
+    # GathererEngine once it is summoned, these attributes read and write its row there
+    state = EngineField('state', STATES.__getitem__, STATES.index)
+    direction = EngineField('direction', DIRECTIONS.__getitem__, DIRECTIONS.index)
+    moving = EngineField('moving')
+    max_capacity = EngineField('max_capacity')
+    gathering_speed = EngineField('gathering_speed')
+    moving_speed = EngineField('speed')
+    gathering_wait = EngineField('wait')
+    last_gather_time = EngineField('last_gather')
+    first_gather = EngineField('first_gather')
+
+    def __init__(self, name, description, max_capacity, gathering_speed, moving_speed, resources_gatherable):
+        self.engine = None
+        self.index = None
+        self.name = name
+        self.description = description
+
+        self.base_max_capacity = max_capacity
+        self.max_capacity = max_capacity
+        self.base_gathering_speed = gathering_speed
+        self.gathering_speed = gathering_speed
+        self.base_moving_speed = moving_speed
+        self.moving_speed = moving_speed
+
+        self.gathering_wait = 1/self.gathering_speed
+        self.stats_version = 0  # Modifiers version the stats were worked out for, 0 is no task masters
+        self.last_gather_time = 0
+        self.resources_gatherable = resources_gatherable
+        self._inventory = {}
+        for resource in self.resources_gatherable:
+            self._inventory[resource] = 0
+        self.state = 'idle'
+        self.position = (0,0)
+        self.assignment = None
+        self.moving = False
+        self.direction = 'down'
+        self.first_gather = True
+
+    @property
+    def inventory(self):
+        if self.engine is None:
+            return self._inventory
+        return self.engine.inventory_of(self.index, self.resources_gatherable)
+
+    @property
+    def position(self):
+        if self.engine is None:
+            return self._position
+        return self.engine.position_of(self.index)
+
+    @position.setter
+    def position(self, position):
+        if self.engine is None:
+            self._position = position
+        else:
+            self.engine.move(self.index, position)
+
+    def update_stats(self, modifiers):
+        # Only for gatherers not in the engine yet, it keeps its own rows up to date
+        if self.stats_version == modifiers.version:
+            return
+        bonuses = modifiers.bonuses
+        self.max_capacity = (self.base_max_capacity+bonuses['max_capacity']['additive'])*bonuses['max_capacity']['multiplicative']
+        self.gathering_speed = (self.base_gathering_speed+bonuses['gathering_speed']['additive'])*bonuses['gathering_speed']['multiplicative']
+        self.moving_speed = (self.base_moving_speed+bonuses['moving_speed']['additive'])*bonuses['moving_speed']['multiplicative']
+        self.gathering_wait = 1/self.gathering_speed
+        self.stats_version = modifiers.version
+
+    def set_assignment(self, assignment):
+        # [deposit id, deposit rect, resource, tile], start gathering it
+        self.assignment = assignment
+        self.state = 'gathering'
+        if self.engine is not None:
+            self.engine.assign(self.index, assignment[3], assignment[2])
+
+class GathererEngine:
+    # Every summoned gatherer's state kept as one row of a set of numpy arrays.
+    # A gatherer only changes state at a few moments (reaching its deposit, each
+    # gather, reaching the portal) and walks in a straight line in between, so
+    # instead of stepping everyone every tick the engine works out when each
+    # gatherer's next event is due and keeps those ticks in a heap, with the
+    # rows due at each tick bucketed by tick so gatherers due together go in and
+    # come out together. A tick only touches the gatherers whose events are due,
+    # and positions are worked out from the current leg when something asks for
+    # them. Gatherer objects are views on their row, see EngineField.
+
+    ARRAYS = {
+        'target': ((2,), np.float64),  # Tile of the deposit being gathered
+        'resource': ((), np.intp),  # Index of the resource being gathered, -1 without an assignment
+        'state': ((), np.int8),
+        'direction': ((), np.int8),
+        'moving': ((), np.bool_),
+        'base_max_capacity': ((), np.float64),
+        'base_gathering_speed': ((), np.float64),
+        'base_moving_speed': ((), np.float64),
+        'max_capacity': ((), np.float64),
+        'gathering_speed': ((), np.float64),
+        'speed': ((), np.float64),
+        'wait': ((), np.float64),
+        'last_gather': ((), np.float64),
+        'first_gather': ((), np.bool_),
+        # The current leg: walking from origin along heading, one speed step a
+        # tick from the tick after depart, for leg_ticks ticks or length tiles
+        'origin': ((2,), np.float64),
+        'heading': ((2,), np.float64),
+        'length': ((), np.float64),
+        'depart': ((), np.int64),
+        'leg_ticks': ((), np.int64),
+        'due': ((), np.int64),  # Tick of the next event, -1 for none
+    }
+
+    def __init__(self, resources):
+        self.resources = list(resources)
+        self.resource_index = {resource: i for i, resource in enumerate(self.resources)}
+        self.count = 0
+        self.tick = 0  # Last tick run
+        self.events = []  # Heap of the ticks that have rows waiting in self.due_rows
+        self.due_rows = {}  # Tick: [rows], a row whose due has changed since is stale and skipped
+        self.known_positions = None  # (tick, every row's position) once asked for that tick, kept up to date by plan()
+        self.stats_version = 0  # Modifiers version the stats rows were worked out for
+        for name, (shape, dtype) in self.ARRAYS.items():
+            setattr(self, name, np.zeros((0,) + shape, dtype))
+        self.inventory = np.zeros((0, len(self.resources)), np.int64)
+
+    def grow(self):
+        size = max(64, 2 * len(self.state))
+        for name in list(self.ARRAYS) + ['inventory']:
+            old = getattr(self, name)
+            new = np.zeros((size,) + old.shape[1:], old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, gatherer):
+        # Move a gatherer's state into a new row, the object reads and writes the row from then on
+        if self.count == len(self.state):
+            self.grow()
+        self.known_positions = None
+        fields = {name: getattr(gatherer, name) for cls in type(gatherer).__mro__ for name, field in vars(cls).items() if isinstance(field, EngineField)}
+        inventory = gatherer.inventory
+        position = gatherer.position
+        i = self.count
+        self.count += 1
+        gatherer.engine, gatherer.index = self, i
+        for name, value in fields.items():
+            setattr(gatherer, name, value)
+        self.base_max_capacity[i] = gatherer.base_max_capacity
+        self.base_gathering_speed[i] = gatherer.base_gathering_speed
+        self.base_moving_speed[i] = gatherer.base_moving_speed
+        self.inventory[i] = 0
+        for resource, amount in inventory.items():
+            if resource in self.resource_index:
+                self.inventory[i, self.resource_index[resource]] = amount
+        self.resource[i] = -1
+        self.move(i, position)
+        if gatherer.assignment:
+            self.assign(i, gatherer.assignment[3], gatherer.assignment[2])
+
+    def assign(self, i, tile, resource):
+        self.target[i] = tile
+        self.resource[i] = self.resource_index[resource]
+        self.plan(np.array([i]))
+        self.schedule(np.array([i]))
+
+    def move(self, i, position):
+        # Put a gatherer somewhere and set it off from there
+        self.origin[i] = position
+        self.depart[i] = self.tick
+        self.leg_ticks[i] = 0
+        self.plan(np.array([i]))
+        self.schedule(np.array([i]))
+
+    def positions(self, rows):
+        # Where the given gatherers are at the current tick
+        walked = np.minimum(np.minimum(np.maximum(self.tick - self.depart[rows], 0), self.leg_ticks[rows]) * self.speed[rows], self.length[rows])
+        return self.origin[rows] + self.heading[rows] * walked[:, None]
+
+    def position_of(self, i):
+        # The renderer asks for every gatherer every frame, so the first one asked
+        # for in a tick works them all out at once
+        if self.known_positions is None or self.known_positions[0] != self.tick:
+            self.known_positions = (self.tick, self.positions(np.arange(self.count)))
+        return tuple(self.known_positions[1][i].tolist())
+
+    def plan(self, rows):
+        # Start the given gatherers on a new leg from where they are now: to the
+        # deposit when gathering, back to the portal at the origin when dropping
+        # off. Walking stops within 0.5 of the goal, that many speed steps away
+        origin = self.positions(rows)
+        if self.known_positions is not None and self.known_positions[0] == self.tick:
+            self.known_positions[1][rows] = origin
+        state = self.state[rows]
+        active = (self.resource[rows] >= 0) & (state != IDLE)
+        delta = np.where((state == GATHERING)[:, None], self.target[rows], 0.0) - origin
+        length = np.sqrt(delta[:, 0]**2 + delta[:, 1]**2)
+        walking = active & (length > 0.5)
+        heading = np.divide(delta, length[:, None], out = np.zeros_like(delta), where = walking[:, None])
+        self.origin[rows] = origin
+        self.heading[rows] = heading
+        self.length[rows] = np.where(walking, length, 0)
+        self.depart[rows] = self.tick
+        self.leg_ticks[rows] = np.where(walking, np.ceil((length - 0.5) / self.speed[rows]), 0)
+        # Facing the way it walks for the whole leg
+        direction = np.where(np.abs(heading[:, 0]) > np.abs(heading[:, 1]), LEFT + (heading[:, 0] > 0), UP - (heading[:, 1] > 0))
+        self.direction[rows[walking]] = direction[walking]
+        self.moving[rows[walking]] = True
+
+    def next_gather(self, rows, start):
+        # First tick from start on that passes the gather check in update()
+        last, wait = self.last_gather[rows], self.wait[rows]
+        due = np.maximum(start, np.ceil((last + wait) * TICK_RATE) - 2).astype(np.int64)
+        early = due * TICK - last < wait - EPSILON
+        while early.any():
+            due[early] += 1
+            early = due * TICK - last < wait - EPSILON
+        return due
+
+    def schedule(self, rows, push = True):
+        # Work out the given gatherers' next events: dropping off the tick after
+        # reaching the portal, gathering once at the deposit and the wait is up
+        state = self.state[rows]
+        active = (self.resource[rows] >= 0) & (state != IDLE)
+        arrive = self.depart[rows] + self.leg_ticks[rows] + 1
+        due = np.where(state == DROP_OFF, arrive, self.next_gather(rows, arrive))
+        due[~active] = -1
+        self.due[rows] = due
+        if push:
+            self.push(rows[active], due[active])
+
+    def push(self, rows, due):
+        # File rows under their due ticks, a tick goes on the heap with its first rows.
+        # A few rows are quicker one at a time than grouped with numpy
+        if len(rows) > 64:
+            order = np.argsort(due, kind = 'stable')
+            ticks, starts = np.unique(due[order], return_index = True)
+            rows, bounds = rows[order].tolist(), starts.tolist() + [len(rows)]
+            parts = ((tick, rows[start:end]) for tick, start, end in zip(ticks.tolist(), bounds, bounds[1:]))
+        else:
+            parts = ((tick, [row]) for tick, row in zip(due.tolist(), rows.tolist()))
+        for tick, part in parts:
+            if tick in self.due_rows:
+                self.due_rows[tick] += part
+            else:
+                self.due_rows[tick] = part
+                heapq.heappush(self.events, tick)
+
+    def reschedule(self):
+        # Rebuild the heap from scratch after every row's events moved
+        n = self.count
+        rows = np.flatnonzero(self.due[:n] >= 0)
+        self.events, self.due_rows = [], {}
+        self.push(rows, self.due[rows])
+
+    def inventory_of(self, i, resources):
+        return {resource: self.inventory[i, self.resource_index[resource]].item() if resource in self.resource_index else 0
+                for resource in resources}
+
+    def apply_bonuses(self, bonuses):
+        n = self.count
+        self.max_capacity[:n] = (self.base_max_capacity[:n]+bonuses['max_capacity']['additive'])*bonuses['max_capacity']['multiplicative']
+        self.gathering_speed[:n] = (self.base_gathering_speed[:n]+bonuses['gathering_speed']['additive'])*bonuses['gathering_speed']['multiplicative']
+        self.speed[:n] = (self.base_moving_speed[:n]+bonuses['moving_speed']['additive'])*bonuses['moving_speed']['multiplicative']
+        self.wait[:n] = 1/self.gathering_speed[:n]
+
+    def refresh_stats(self, modifiers):
+        # Work every row's stats out again, only if the task masters changed since
+        # the last time. Walking gatherers set off again from where they are at the new speed
+        if self.stats_version != modifiers.version:
+            n = self.count
+            walking = np.flatnonzero(self.depart[:n] + self.leg_ticks[:n] > self.tick)
+            self.origin[walking] = self.positions(walking)
+            self.depart[walking] = self.tick
+            self.leg_ticks[walking] = 0
+            self.apply_bonuses(modifiers.bonuses)
+            self.stats_version = modifiers.version
+            self.plan(walking)
+            self.schedule(np.arange(n), push = False)
+            self.reschedule()
+
+    def cycles(self):
+        # Ticks every gatherer takes for one round trip, and the load it brings
+        # back each time, worked out from its stats the way update() plays out:
+        # walk to the deposit, one tick for the first gather, more gathers every
+        # interval ticks until full, walk back and one tick to drop off. A walk
+        # stops within 0.5 of the goal, so a leg averages (distance - 1) / speed + 1 ticks.
+        n = self.count
+        distance = np.sqrt(self.target[:n, 0]**2 + self.target[:n, 1]**2)
+        walk = np.maximum(distance - 1, 0) / self.speed[:n] + 1
+        wait = self.wait[:n]
+        interval = np.maximum(1, np.ceil(wait * TICK_RATE - EPSILON))
+        per_gather = np.ceil(interval * TICK / wait - EPSILON)
+        gathers = np.ceil(np.maximum(self.max_capacity[:n] - 1, 0) / per_gather)
+        return 2 * walk + 2 + gathers * interval, 1 + gathers * per_gather
+
+    def fast_forward(self, ticks):
+        # Resources every assigned gatherer brings back over the given ticks, as {resource: amount}
+        n = self.count
+        if not n:
+            self.tick += ticks
+            return {}
+        working = (self.resource[:n] >= 0) & (self.state[:n] != IDLE)
+        cycle, load = self.cycles()
+        totals = np.bincount(self.resource[:n][working], weights = (load * ticks / cycle)[working], minlength = len(self.resources))
+        # Everything scheduled moves along with the clock, so gatherers pick up where they were
+        # and the skipped time is not gathered again on the next tick
+        self.tick += ticks
+        self.last_gather[:n] += ticks * TICK
+        self.depart[:n] += ticks
+        self.due[:n][self.due[:n] >= 0] += ticks
+        self.reschedule()
+        return {self.resources[i]: int(totals[i]) for i in np.flatnonzero(totals)}
+
+    def update(self, simulation):
+        # One tick: pop every event due and handle them together. Gathering adds
+        # to the inventory until full, then the gatherer heads back to the portal,
+        # drops everything off there and heads out to the deposit again
+        self.tick = simulation.ticks
+        events = self.events
+        due = []
+        while events and events[0] <= self.tick:
+            tick = heapq.heappop(events)
+            rows = np.array(self.due_rows.pop(tick))
+            due.append(rows[self.due[rows] == tick])
+        if not due:
+            return
+        due = np.unique(np.concatenate(due))
+        state = self.state[due]
+
+        now = simulation.time
+        g = due[state == GATHERING]
+        if len(g):
+            resource = self.resource[g]
+            amount = np.where(self.first_gather[g], 1, np.ceil((now - self.last_gather[g]) / self.wait[g] - EPSILON)).astype(np.int64)
+            self.inventory[g, resource] += amount
+            self.last_gather[g] = now
+            self.first_gather[g] = False
+            full = g[self.inventory[g, resource] >= self.max_capacity[g]]
+            self.state[full] = DROP_OFF
+            self.first_gather[full] = True
+
+        d = due[state == DROP_OFF]
+        if len(d):
+            resource = self.resource[d]
+            totals = np.bincount(resource, weights = self.inventory[d, resource], minlength = len(self.resources))
+            for i in np.flatnonzero(totals):
+                simulation.resource_quantities[self.resources[i]] += int(totals[i])
+            self.inventory[d, resource] = 0
+            self.state[d] = GATHERING
+
+        # Whoever filled up or dropped off sets off on its next leg
+        legs = due[self.state[due] != state]
+        if len(legs):
+            self.plan(legs)
+        self.schedule(due)
+
+class Simulation:
+    # Everything in the game that changes over time: the summoned gatherers and
+    # task masters, what they are assigned to, the resources they bring back and
+    # the bonuses the task masters give. step(dt) advances it in fixed ticks
+    # however often it is called, so the economy runs at the same speed at any
+    # frame rate and can run without a screen. Rendering only reads from it.
+    # update() steps by however much time the clock says has passed, and every
+    # random roll comes from self.random, so a ManualClock and a seed make a run
+    # repeatable.
+
+    def __init__(self, resources, clock = None, seed = None):
+        self.clock = clock if clock is not None else RealClock()
+        self.random = random.Random(seed)
+        self.gatherers = []
+        self.task_masters = []
+        self.task_master_events = []  # Heap of (tick, order added, task master) for when each one next has something to do
+        self.task_master_order = itertools.count()
+        self.untargeted = []  # Gatherers no task master is following, in no particular order
+        self.assignments = {}
+        self.resource_quantities = ResourceLedger(resources)
+        self.gatherer_engine = GathererEngine(resources)
+        self.modifiers = Modifiers()
+        self.bonuses = self.modifiers.bonuses  # Updated in place
+
+        self.time = 0  # Simulated seconds
+        self.ticks = 0
+        self.accumulator = 0
+
+    def update(self):
+        seconds = self.clock.elapsed()
+        self.step(seconds, seconds / self.clock.warp)
+
+    def step(self, dt, real = None):
+        # Run every whole tick that fits in the time passed, the rest carries over to the next step.
+        # real is the unwarped time dt stands for, only a long wait in real time is fast forwarded,
+        # so a warped clock still plays out every tick of movement and gathering
+        if (dt if real is None else real) > FAST_FORWARD_AFTER:
+            self.fast_forward(dt)
+            return
+        self.accumulator += dt
+        while self.accumulator >= TICK:
+            self.accumulator -= TICK
+            self.tick()
+
+    def tick(self):
+        self.ticks += 1
+        self.time = self.ticks * TICK
+        self.gatherer_engine.refresh_stats(self.modifiers)
+        self.gatherer_engine.update(self)
+        events = self.task_master_events
+        while events and events[0][0] <= self.ticks:
+            tick, order, task_master = heapq.heappop(events)
+            if task_master.due == tick:
+                self.wake(task_master, task_master.update(self))
+
+    def wake(self, task_master, tick):
+        # Have the task master updated on that tick, any earlier wake up is dropped
+        task_master.due = tick
+        heapq.heappush(self.task_master_events, (tick, next(self.task_master_order), task_master))
+
+    def fast_forward(self, seconds):
+        # Skip ahead in closed form, crediting what the gatherers would have brought
+        # back with their current (bonused) stats. Positions and task masters stay
+        # where they are. Returns the resources gained
+        ticks = int(seconds * TICK_RATE)
+        self.gatherer_engine.refresh_stats(self.modifiers)
+        gained = self.gatherer_engine.fast_forward(ticks)
+        for resource, amount in gained.items():
+            self.resource_quantities[resource] += amount
+        for task_master in self.task_masters:
+            task_master.position = task_master.position  # Stop them where they are, they set off again next tick
+        self.ticks += ticks
+        self.time = self.ticks * TICK
+        self.task_master_events = []
+        for task_master in self.task_masters:
+            self.wake(task_master, self.ticks + 1)
+        return gained
+
+    def add_task_master(self, task_master):
+        self.add_task_masters([task_master])
+
+    def add_task_masters(self, task_masters):
+        # A batch of one kind, summoned together. Their effect goes on the totals
+        # once for all of them and the gatherers' stats catch up on the next tick
+        for task_master in task_masters:
+            self.task_masters.append(task_master)
+            task_master.simulation = self
+            self.wake(task_master, self.ticks + 1)
+        if task_masters:
+            self.modifiers.apply(task_masters[0].effect, len(task_masters))
+
+    def remove_task_master(self, task_master):
+        self.task_masters.remove(task_master)
+        task_master.position = task_master.position
+        task_master.simulation = task_master.due = None
+        if task_master.target is not None:
+            self.release_target(task_master.target)
+            task_master.target = None
+        self.modifiers.remove(task_master.effect)
+
+    def add_gatherer(self, gatherer):
+        gatherer.update_stats(self.modifiers)
+        self.gatherers.append(gatherer)
+        self.gatherer_engine.add(gatherer)
+        self.untargeted.append(gatherer)
+
+    def claim_target(self):
+        # Take a random gatherer no task master is following out of the pool, or None.
+        # The last one is swapped into its slot so the pool never has to shift
+        if not self.untargeted:
+            return None
+        i = self.random.randrange(len(self.untargeted))
+        gatherer = self.untargeted[i]
+        self.untargeted[i] = self.untargeted[-1]
+        self.untargeted.pop()
+        return gatherer
+
+    def release_target(self, gatherer):
+        self.untargeted.append(gatherer)
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+import pygame
+
+import balance
+import world
+
+class FindDepositsTest(unittest.TestCase):
+    # The runner has to play on the deposits a player can actually send gatherers to
+
+    @classmethod
+    def setUpClass(cls):
+        # A headless Game with the music off, run from the game's directory for its sprites and fonts
+        from main import Game
+        cls.cwd = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        cls.directory = tempfile.TemporaryDirectory()
+        load, play = pygame.mixer.music.load, pygame.mixer.music.play
+        pygame.mixer.music.load = pygame.mixer.music.play = lambda *args, **kwargs: None
+        try:
+            cls.game = Game()
+        finally:
+            pygame.mixer.music.load, pygame.mixer.music.play = load, play
+        cls.game.chunk_streamer.shutdown()
+        cls.game.region_store.close()
+        cls.game.region_store = world.RegionStore(cls.directory.name, cls.game.CHUNK_SIZE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.game.region_store.close()
+        cls.directory.cleanup()
+        os.chdir(cls.cwd)
+        pygame.quit()
+
+    def game_deposits(self, radius):
+        # {deposit id: (resource, deposit)} over the chunks the game would have loaded, the ones it starts with and the ones it generates
+        game = self.game
+        coords = [(x, y) for x in range(-radius, radius + 1) for y in range(-radius, radius + 1)]
+        chunks = game.generate_chunks([coord for coord in coords if coord not in game.chunks])
+        chunks.update({coord: game.chunks[coord] for coord in coords if coord in game.chunks})
+        return {(chunk.x, chunk.y, i): (game.resource_names[deposit[4]], deposit) for chunk in chunks.values() for i, deposit in enumerate(chunk.deposits)}
+
+    def test_deposits_match_the_game(self):
+        game_deposits = self.game_deposits(balance.WORLD_RADIUS)
+        runner = {deposit_id: resource for _, deposit_id, resource, _ in balance.find_deposits(self.game.SEED)}
+        self.assertTrue(runner)
+        self.assertEqual(runner, {deposit_id: game_deposits[deposit_id][0] for deposit_id in runner if deposit_id in game_deposits})
+        # The only ones left out are under the portal, where they can't be clicked on
+        for deposit_id in set(game_deposits) - set(runner):
+            x, y, width, height, _ = game_deposits[deposit_id][1]
+            tile = (min(max(0, x), x + width - 1), min(max(0, y), y + height - 1))
+            self.assertLessEqual(max(abs(tile[0]), abs(tile[1])), balance.PORTAL_RADIUS)
+
+    def test_portal_chunk_is_empty(self):
+        for seed in (world.SEED, world.SEED + 1, world.SEED + 2):
+            self.assertFalse([deposit for deposit in balance.find_deposits(seed) if deposit[1][:2] == world.PORTAL_CHUNK])
+
+if __name__ == '__main__':
+    unittest.main()
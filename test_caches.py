@@ -0,0 +1,125 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import user_interface
+import world
+from caches import ChunkSurfaceCache, SpriteCache, TextCache
+
+class ChunkSurfaceCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rasterized = []
+        self.cache = ChunkSurfaceCache(self.rasterize, budget = 2 * 64 * 64 * 4)
+        self.chunks = [world.Chunk(x, 0, 4, [(x * 4, 0, 1, 1, 1)]) for x in range(4)]
+
+    def rasterize(self, chunk, tile_size):
+        self.rasterized.append((chunk.x, chunk.y, tile_size))
+        return pygame.Surface((chunk.size * tile_size, chunk.size * tile_size), pygame.SRCALPHA)
+
+    def test_surfaces_are_kept_per_zoom(self):
+        chunk = self.chunks[0]
+        first = self.cache.get(chunk, 16)
+        self.assertIs(self.cache.get(chunk, 16), first)
+        self.cache.get(chunk, 8)
+        self.assertEqual(self.rasterized, [(0, 0, 16), (0, 0, 8)])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 2))
+
+    def test_empty_chunks_are_not_rasterized(self):
+        self.assertIsNone(self.cache.get(world.Chunk(5, 5, 4), 16))
+        self.assertIsNone(self.cache.get(world.Chunk(5, 5, 4), 16))
+        self.assertEqual(self.rasterized, [])
+
+    def test_invalidate_drops_every_zoom(self):
+        chunk = self.chunks[0]
+        self.cache.get(chunk, 16)
+        self.cache.get(chunk, 8)
+        self.cache.get(self.chunks[1], 16)
+        self.cache.invalidate([(0, 0)])
+        self.cache.get(chunk, 16)
+        self.cache.get(self.chunks[1], 16)
+        self.assertEqual(self.rasterized, [(0, 0, 16), (0, 0, 8), (1, 0, 16), (0, 0, 16)])
+        self.assertEqual(self.cache.used, 2 * 64 * 64 * 4)
+
+    def test_eviction_keeps_last_frame(self):
+        # Over budget, the least recently used go first but never what was just drawn
+        for chunk in self.chunks[:3]:
+            self.cache.get(chunk, 16)
+        self.cache.next_frame()
+        self.assertEqual(len(self.cache.surfaces), 3)
+        self.cache.get(self.chunks[3], 16)
+        self.cache.next_frame()
+        self.assertEqual(list(self.cache.surfaces), [(2, 0, 16), (3, 0, 16)])
+
+class SpriteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.sprites = [pygame.Surface((4, 4)) for i in range(3)]
+
+    def test_scaled_once_per_size(self):
+        cache = SpriteCache()
+        scaled = cache.scale(self.sprites[0], (8, 8))
+        self.assertEqual(scaled.get_size(), (8, 8))
+        self.assertIs(cache.scale(self.sprites[0], (8.4, 8.9)), scaled)
+        self.assertIsNot(cache.scale(self.sprites[1], (8, 8)), scaled)
+        cache.scale(self.sprites[0], (16, 16))
+        self.assertEqual((cache.hits, cache.misses), (1, 3))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SpriteCache(max_entries = 2)
+        first = cache.scale(self.sprites[0], (8, 8))
+        cache.scale(self.sprites[1], (8, 8))
+        self.assertIs(cache.scale(self.sprites[0], (8, 8)), first)
+        cache.scale(self.sprites[2], (8, 8))
+        self.assertEqual([key[0] for key in cache.sprites], [self.sprites[0], self.sprites[2]])
+        cache.scale(self.sprites[1], (8, 8))  # Evicted, scaled again
+        self.assertEqual(len(cache.sprites), 2)
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+class TextCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        pygame.display.init()
+        pygame.display.set_mode((16, 16))  # render_text_outline converts its surfaces for the display
+        pygame.font.init()
+        self.font = pygame.font.Font(None, 18)
+        self.cache = TextCache(max_entries = 2)
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def test_rendered_once(self):
+        text = self.cache.render(self.font, '12', False, (255, 255, 255))
+        self.assertIs(self.cache.render(self.font, '12', False, [255, 255, 255]), text)
+        self.assertIsNot(self.cache.render(self.font, '12', True, (255, 255, 255)), text)
+        self.assertEqual(self.cache.stats(), {'entries': 2, 'hits': 1, 'misses': 2, 'evictions': 0, 'hit_rate': 1 / 3})
+
+    def test_least_recently_used_is_evicted(self):
+        a = self.cache.render(self.font, 'a', False, (255, 255, 255))
+        self.cache.render(self.font, 'b', False, (255, 255, 255))
+        self.assertIs(self.cache.render(self.font, 'a', False, (255, 255, 255)), a)
+        self.cache.render(self.font, 'c', False, (255, 255, 255))
+        self.assertEqual([key[1] for key in self.cache.surfaces], ['a', 'c'])
+        self.assertEqual((self.cache.hits, self.cache.misses, self.cache.evictions), (1, 3, 1))
+
+    def test_outlines_do_not_collide_with_plain_text(self):
+        shared, user_interface.text_cache = user_interface.text_cache, TextCache()
+        try:
+            cache = user_interface.text_cache
+            plain = cache.render(self.font, 'Exit', True, (0, 0, 0))
+            outlined = user_interface.render_text_outline('Exit', self.font)
+            grey = user_interface.render_text_outline('Exit', self.font, ocolor = (180, 180, 180))
+            self.assertIs(user_interface.render_text_outline('Exit', self.font), outlined)
+            self.assertIs(cache.render(self.font, 'Exit', True, (0, 0, 0)), plain)
+        finally:
+            user_interface.text_cache = shared
+        self.assertEqual(len({id(plain), id(outlined), id(grey)}), 3)
+        self.assertEqual(outlined.get_width(), plain.get_width() + 4)
+        self.assertIn((self.font, 'Exit', True, ((0, 0, 0), (255, 255, 255), 2)), cache.surfaces)
+        self.assertEqual((cache.hits, cache.misses), (2, 3))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import os
+import unittest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+from display import DirtyRects, Layer
+
+class LayerTest(unittest.TestCase):
+    # Whatever Layer.present redraws, the screen has to end up as a full redraw would leave it
+
+    def setUp(self):
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((64, 48))
+        self.background = pygame.Surface((64, 48))
+        self.background.fill((40, 80, 120))
+        self.screen.blit(self.background, (0, 0))
+        self.dirty = DirtyRects(self.screen)
+        self.layer = Layer(self.screen, self.dirty)
+        # Translucent like a sprite's anti-aliased edges, so stacked copies come out darker
+        self.sprite = pygame.Surface((8, 8), pygame.SRCALPHA)
+        self.sprite.fill((255, 255, 255, 100))
+        self.other = pygame.Surface((6, 6), pygame.SRCALPHA)
+        self.other.fill((200, 0, 0, 160))
+
+    def tearDown(self):
+        pygame.display.quit()
+
+    def frame(self, blits):
+        for surface, position in blits:
+            self.layer.blit(surface, position)
+        self.layer.present()
+        expected = self.background.copy()
+        for surface, position in blits:
+            expected.blit(surface, position)
+        self.assertEqual(pygame.image.tobytes(self.screen, 'RGB'), pygame.image.tobytes(expected, 'RGB'))
+
+    def test_moving_and_disappearing(self):
+        self.frame([(self.sprite, (10, 10)), (self.other, (30, 20))])
+        self.frame([(self.sprite, (12, 10)), (self.other, (30, 20))])
+        self.frame([(self.other, (30, 20))])
+        self.frame([(self.other, (30, 20))])
+        self.assertEqual(self.dirty.skipped, 1)
+
+    def test_coincident_blits(self):
+        # An x10 summon puts every slime on the same spot, then they walk off one by one
+        self.frame([(self.sprite, (10, 10))] * 2 + [(self.other, (12, 12))])
+        self.frame([(self.sprite, (10, 10))] + [(self.other, (12, 12))])
+        self.frame([(self.sprite, (10, 10))] * 3 + [(self.other, (12, 12))])
+        self.frame([(self.sprite, (10, 10))] * 3 + [(self.other, (12, 12))])
+        self.assertEqual(self.dirty.flips, 1)
+        self.assertEqual(self.dirty.skipped, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import economy
+from simulation import Simulation, GathererModel, ManualClock, TICK_RATE
+
+# (gatherer, resource, deposit tile), near and far deposits of a few kinds
+GATHERERS = [
+    ('Green Worker Slime', 'Essence', (4, 5)),
+    ('Green Worker Slime', 'Wood', (-12, 3)),
+    ('Red Worker Slime', 'Gold', (20, -17)),
+    ('Red Worker Slime', 'Essence', (-30, -8)),
+    ('Blue Worker Slime', 'Iron', (9, 25)),
+]
+
+TASK_MASTERS = ['Minor Demon', 'Demon', 'Major Demon']
+
+def build(task_masters, clock = None):
+    simulation = Simulation(economy.RESOURCES, clock = clock, seed = 1)
+    for name in task_masters:
+        simulation.modifiers.apply(economy.TASK_MASTERS[name]['effect'])
+    for i, (name, resource, tile) in enumerate(GATHERERS):
+        gatherer = GathererModel(name, **economy.GATHERERS[name])
+        gatherer.position = (0,3)
+        simulation.add_gatherer(gatherer)
+        gatherer.set_assignment([(0, 0, i), None, resource, tile])
+    return simulation
+
+class FastForwardTest(unittest.TestCase):
+    # Simulation.fast_forward against ticking the same setup through the same time
+
+    SECONDS = 1200
+
+    def check(self, task_masters):
+        ticked = build(task_masters)
+        for tick in range(self.SECONDS * TICK_RATE):
+            ticked.tick()
+        skipped = build(task_masters)
+        gained = skipped.fast_forward(self.SECONDS)
+
+        self.assertEqual(skipped.ticks, ticked.ticks)
+        self.assertEqual(dict(skipped.resource_quantities), {resource: gained.get(resource, 0) for resource in economy.RESOURCES})
+        for resource in economy.RESOURCES:
+            # Ticking only counts what has been dropped off, fast forward also what
+            # the gatherers are carrying, so they can be up to a load apart each
+            loads = sum(gatherer.max_capacity for gatherer in ticked.gatherers if gatherer.assignment[2] == resource)
+            with self.subTest(resource = resource):
+                self.assertLessEqual(abs(skipped.resource_quantities[resource] - ticked.resource_quantities[resource]), loads)
+                if loads:
+                    self.assertGreater(ticked.resource_quantities[resource], 0)
+
+    def test_matches_ticking(self):
+        self.check([])
+
+    def test_matches_ticking_with_task_masters(self):
+        self.check(TASK_MASTERS)
+
+    def test_task_masters_speed_it_up(self):
+        plain = build([]).fast_forward(self.SECONDS)
+        bonused = build(TASK_MASTERS).fast_forward(self.SECONDS)
+        for resource, amount in plain.items():
+            self.assertGreater(bonused[resource], amount)
+
+class WarpTest(unittest.TestCase):
+
+    def test_warped_frames_are_ticked_through(self):
+        # x1000 at 50 frames a second is 1000 ticks a frame, every one of them played out
+        clock = ManualClock(warp = 1000)
+        warped = build(TASK_MASTERS, clock)
+        for frame in range(5):
+            clock.advance(1 / TICK_RATE)
+            warped.update()
+        ticked = build(TASK_MASTERS)
+        for tick in range(warped.ticks):
+            ticked.tick()
+        self.assertGreaterEqual(warped.ticks, 5 * 1000 - 1)
+        self.assertEqual(dict(warped.resource_quantities), dict(ticked.resource_quantities))
+        self.assertEqual([gatherer.position for gatherer in warped.gatherers], [gatherer.position for gatherer in ticked.gatherers])
+        self.assertEqual([gatherer.state for gatherer in warped.gatherers], [gatherer.state for gatherer in ticked.gatherers])
+
+    def test_long_waits_are_fast_forwarded(self):
+        clock = ManualClock()
+        waited = build([], clock)
+        clock.advance(60)
+        waited.update()
+        self.assertEqual(waited.ticks, 60 * TICK_RATE)
+        self.assertEqual(dict(waited.resource_quantities), dict(build([]).resource_quantities) | build([]).fast_forward(60))
+        self.assertEqual([gatherer.position for gatherer in waited.gatherers], [(0,3)] * len(GATHERERS))
+
+if __name__ == '__main__':
+    unittest.main()
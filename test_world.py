@@ -0,0 +1,73 @@
+import random
+import unittest
+
+import economy
+import world
+
+# Run with python -m unittest (or pytest) from this directory
+
+def mappings(seed = world.SEED):
+    resource_ids = {name: i + 1 for i, name in enumerate(economy.RESOURCES)}
+    return economy.resource_mappings(random.Random(seed), resource_ids)
+
+def block(radius):
+    return [(x, y) for x in range(-radius, radius + 1) for y in range(-radius, radius + 1)]
+
+def tile_roll(chunk_seed, tile):
+    z = (chunk_seed + (tile + 1) * world.GOLDEN_GAMMA) & world.MASK64
+    z = ((z ^ (z >> 30)) * world.MIX_1) & world.MASK64
+    z = ((z ^ (z >> 27)) * world.MIX_2) & world.MASK64
+    return z ^ (z >> 31)
+
+def reference_deposits(seed, chunk_x, chunk_y, chunk_size, resource_probability, resource_mappings):
+    # What world.generate_chunks works out with numpy, a tile at a time in plain python
+    threshold = world.deposit_threshold(resource_probability)
+    mapping = resource_mappings[world.resource_band(chunk_x, chunk_y)]
+    seed = world.chunk_seed(seed, chunk_x, chunk_y)
+    deposits = []
+    for i in range(chunk_size * chunk_size):
+        roll = tile_roll(seed, i)
+        if roll & 0xFFFFFF < threshold and len(deposits) < world.MAX_DEPOSITS:
+            span_x = 1 + ((roll >> 24 & 0xFFF) * world.MAX_SPAN >> 12)
+            span_y = 1 + ((roll >> 36 & 0xFFF) * world.MAX_SPAN >> 12)
+            resource = mapping[1 + ((roll >> 48) * 100 >> 16)]
+            x, y = i // chunk_size, i % chunk_size
+            deposits.append((chunk_x * chunk_size + x, chunk_y * chunk_size + y, min(span_x, chunk_size - x), min(span_y, chunk_size - y), resource))
+    return deposits
+
+class GenerateChunkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.mappings = mappings()
+
+    def generate(self, coords):
+        return {coord: world.generate_chunk(world.SEED, *coord, world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, self.mappings).deposits
+                for coord in coords}
+
+    def test_order_does_not_matter(self):
+        # A chunk comes out the same whichever order the world is explored in
+        coords = block(15)
+        shuffled = list(coords)
+        random.Random(1).shuffle(shuffled)
+        self.assertEqual(self.generate(coords), self.generate(shuffled))
+
+    def test_batches_match_single_chunks(self):
+        coords = block(15)
+        batch = world.generate_chunks(world.SEED, coords, world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, self.mappings)
+        self.assertEqual({coord: chunk.deposits for coord, chunk in batch.items()}, self.generate(reversed(coords)))
+
+    def test_numpy_matches_plain_python(self):
+        coords = block(15)
+        vectorized = self.generate(coords)
+        reference = {(x, y): reference_deposits(world.SEED, x, y, world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, self.mappings) for x, y in coords}
+        self.assertEqual(vectorized, reference)
+        self.assertTrue(any(vectorized.values()))
+
+    def test_seed_changes_the_world(self):
+        coords = block(5)
+        other = {coord: world.generate_chunk(world.SEED + 1, *coord, world.CHUNK_SIZE, world.RESOURCE_PROBABILITY, self.mappings).deposits
+                 for coord in coords}
+        self.assertNotEqual(self.generate(coords), other)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,8 @@ import pygame
 
 import sys
 
+from caches import text_cache
+
 _circle_cache = {}
 def _circlepoints(r):
     r = int(round(r))
@@ -24,6 +26,10 @@ def _circlepoints(r):
     return points
 
 def render_text_outline(text, font, gfcolor=(0,0,0), ocolor=(255, 255, 255), opx=2):
+    # An outline is a blit per point of its circle, so the finished surface is kept in the text cache
+    return text_cache.get((font, text, True, (gfcolor, ocolor, opx)), lambda: _render_text_outline(text, font, gfcolor, ocolor, opx))
+
+def _render_text_outline(text, font, gfcolor, ocolor, opx):
     textsurface = font.render(text, True, gfcolor).convert_alpha()
     w = textsurface.get_width() + 2 * opx
     h = font.get_height()
@@ -72,7 +78,7 @@ class Button:
 
         self.text_raw = text
         
-        self.text = self.font.render(text, True, (0, 0, 0))
+        self.text = text_cache.render(self.font, text, True, (0, 0, 0))
         self.rect = rect
         self.char = char
         self.event = event
@@ -210,8 +216,8 @@ class StartMenu(Menu):
         self.state = 'start'
         self.states = ['start','options','saves']
         self.font = props.font_large
-        self.text1 = self.font.render("Dark Summoner's",True, (0,0,0))
-        self.text2 = self.font.render("Forge",True, (0,0,0))
+        self.text1 = text_cache.render(self.font, "Dark Summoner's",True, (0,0,0))
+        self.text2 = text_cache.render(self.font, "Forge",True, (0,0,0))
          
         
 
@@ -295,7 +301,7 @@ class TextBox:
             self.font = props.font_large
         
         self.text_raw = text
-        self.text = self.font.render(text, True, (0, 0, 0))
+        self.text = text_cache.render(self.font, text, True, (0, 0, 0))
         self.rect = rect
         self.color = color
         self.text_rect = self.text.get_rect(center=self.rect.center)
@@ -305,7 +311,7 @@ class TextBox:
     
     def render(self):
         if isinstance(self.text_raw,str):
-            self.text = self.font.render(self.text_raw,True, (0,0,0))
+            self.text = text_cache.render(self.font, self.text_raw,True, (0,0,0))
             if self.sizing == 'dynamic':
                 self.rect.width = self.font.size(self.text_raw)[0] + 10
         if self.centering == 'horizontal':
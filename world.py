@@ -0,0 +1,320 @@
+import concurrent.futures
+import hashlib
+import mmap
+import os
+import struct
+from collections import OrderedDict
+
+import numpy as np  # Required like in simulation.py, pygbag ships it for the web build
+
+# Each tile's random rolls come from a splitmix64 hash of the chunk seed and the
+# tile index, so whole batches of tiles can be rolled at once with numpy, in any
+# order. Of the 64 bits, 24 go to the roll for whether a deposit starts on the
+# tile, 12 to each of its spans and 16 to its resource pick. test_world.py checks
+# the batches against a tile by tile generator written out in plain python.
+MASK64 = (1 << 64) - 1
+GOLDEN_GAMMA = 0x9E3779B97F4A7C15
+MIX_1 = 0xBF58476D1CE4E5B9
+MIX_2 = 0x94D049BB133111EB
+MAX_SPAN = 5
+MAX_DEPOSITS = 51  # Deposits kept per chunk, fills a 256 byte region record. A chunk averages 1.3 at the default 0.5%
+
+# The game's world, balance.py plays on the same one
+SEED = 12345
+CHUNK_SIZE = 16
+RESOURCE_PROBABILITY = 0.005
+PORTAL_CHUNK = (0, 0)  # Kept clear for the portal, never generated
+
+class Chunk:
+    # Resource deposits of one chunk. A deposit is a rectangle (x, y, width,
+    # height, resource_id) in world tiles, clipped to the chunk it starts in,
+    # and its id is (chunk_x, chunk_y, index). Later deposits cover earlier ones
+    # where they overlap. Deposits are fixed once the chunk is generated.
+    __slots__ = ('x', 'y', 'size', 'deposits')
+
+    def __init__(self, x, y, size, deposits = None):
+        self.x = x
+        self.y = y
+        self.size = size
+        self.deposits = deposits if deposits is not None else []
+
+    def is_empty(self):
+        return not self.deposits
+
+    def deposit_at(self, tile_x, tile_y):
+        # Index of the topmost deposit covering a tile, or None
+        for i in range(len(self.deposits) - 1, -1, -1):
+            x, y, width, height, _ = self.deposits[i]
+            if x <= tile_x < x + width and y <= tile_y < y + height:
+                return i
+        return None
+
+    def get(self, tile_x, tile_y):
+        # Resource id on a tile, 0 if it is empty
+        i = self.deposit_at(tile_x, tile_y)
+        return 0 if i is None else self.deposits[i][4]
+
+REGION_SIZE = 32  # Chunks along each side of a region file
+REGION_HEADER = struct.Struct('<4sHH')  # Magic, format version, chunk size
+REGION_MAGIC = b'DSFR'
+REGION_VERSION = 2
+REGION_DEPOSIT = struct.Struct('<5B')  # Deposit x and y within the chunk, width, height, resource id
+
+class RegionStore:
+    # Explored chunks saved to disk, grouped into region files of
+    # REGION_SIZE x REGION_SIZE chunks. A region file is a header, a table with
+    # the offset of every chunk's record (0 while the chunk is not saved) and a
+    # fixed size record for every chunk, a deposit count followed by up to
+    # MAX_DEPOSITS deposits. Region files are
+    # memory mapped, so loading a chunk is a slice of the map and only the
+    # regions and pages actually used are ever read. At most max_open regions
+    # stay mapped, the least recently used one is closed to make room.
+
+    def __init__(self, directory, chunk_size, max_open = 16):
+        self.directory = directory
+        self.max_open = max_open
+        self.chunk_size = chunk_size
+        self.record_size = 1 + MAX_DEPOSITS * REGION_DEPOSIT.size
+        self.table_offset = REGION_HEADER.size
+        self.records_offset = self.table_offset + REGION_SIZE * REGION_SIZE * 4
+        self.file_size = self.records_offset + REGION_SIZE * REGION_SIZE * self.record_size
+        self.regions = OrderedDict()
+
+    def region(self, region_x, region_y, create = False):
+        key = (region_x, region_y)
+        if self.regions.get(key) is not None or (key in self.regions and not create):
+            self.regions.move_to_end(key)
+            return self.regions[key]
+        path = os.path.join(self.directory, f'r.{region_x}.{region_y}.region')
+        region = None
+        try:
+            if os.path.exists(path):
+                region = self.map(path)
+                if REGION_HEADER.unpack_from(region) != (REGION_MAGIC, REGION_VERSION, self.chunk_size):
+                    # Saved in an older format or with another chunk size, its chunks are generated again
+                    region.close()
+                    region = None
+            if region is None and create:
+                os.makedirs(self.directory, exist_ok = True)
+                with open(path, 'wb') as file:
+                    file.write(REGION_HEADER.pack(REGION_MAGIC, REGION_VERSION, self.chunk_size))
+                    file.truncate(self.file_size)
+                region = self.map(path)
+        except (OSError, ValueError):
+            # Unreadable, truncated or no mmap support, the chunks get generated instead
+            region = None
+        self.regions[key] = region
+        self.regions.move_to_end(key)
+        if len(self.regions) > self.max_open:
+            self.close_region(self.regions.popitem(last = False)[1])
+        return region
+
+    def map(self, path):
+        with open(path, 'r+b') as file:
+            return mmap.mmap(file.fileno(), self.file_size)
+
+    def close_region(self, region):
+        if region is not None:
+            region.flush()
+            region.close()
+
+    def slot(self, chunk_x, chunk_y):
+        return (chunk_x % REGION_SIZE) * REGION_SIZE + chunk_y % REGION_SIZE
+
+    def load(self, chunk_x, chunk_y):
+        region = self.region(chunk_x // REGION_SIZE, chunk_y // REGION_SIZE)
+        if region is None:
+            return None
+        offset, = struct.unpack_from('<I', region, self.table_offset + self.slot(chunk_x, chunk_y) * 4)
+        if not offset:
+            return None
+        origin_x, origin_y = chunk_x * self.chunk_size, chunk_y * self.chunk_size
+        deposits = [(origin_x + x, origin_y + y, width, height, resource_id) for x, y, width, height, resource_id
+                    in REGION_DEPOSIT.iter_unpack(region[offset + 1:offset + 1 + region[offset] * REGION_DEPOSIT.size])]
+        return Chunk(chunk_x, chunk_y, self.chunk_size, deposits)
+
+    def save(self, chunk):
+        region = self.region(chunk.x // REGION_SIZE, chunk.y // REGION_SIZE, create = True)
+        if region is None:
+            return
+        slot = self.slot(chunk.x, chunk.y)
+        offset = self.records_offset + slot * self.record_size
+        origin_x, origin_y = chunk.x * self.chunk_size, chunk.y * self.chunk_size
+        deposits = chunk.deposits[:MAX_DEPOSITS]
+        record = bytes([len(deposits)]) + b''.join(REGION_DEPOSIT.pack(x - origin_x, y - origin_y, width, height, resource_id)
+                                                   for x, y, width, height, resource_id in deposits)
+        region[offset:offset + len(record)] = record
+        struct.pack_into('<I', region, self.table_offset + slot * 4, offset)
+
+    def close(self):
+        for region in self.regions.values():
+            self.close_region(region)
+        self.regions = OrderedDict()
+
+class ChunkResidency:
+    # Keeps the number of chunks in memory under max_chunks. Chunks remember the
+    # last frame they were near the camera, and once there are too many the ones
+    # unused the longest, furthest from the camera first, are unloaded. Eviction
+    # goes down to low_water of the budget so it happens in occasional batches
+    # instead of a few chunks every frame.
+
+    def __init__(self, max_chunks, low_water = 0.75):
+        self.max_chunks = max_chunks
+        self.low_water = low_water
+        self.last_used = {}
+        self.frame = 0
+        self.evicted = 0
+
+    def next_frame(self):
+        self.frame += 1
+
+    def touch(self, coord):
+        self.last_used[coord] = self.frame
+
+    def over_budget(self, chunks):
+        return len(chunks) > self.max_chunks
+
+    def evict(self, chunks, pinned, center):
+        # Coords of the chunks to unload, pinned chunks and chunks used this frame are kept
+        if not self.over_budget(chunks):
+            return []
+        center_x, center_y = center
+        last_used = self.last_used
+        candidates = [coord for coord in chunks if coord not in pinned and last_used.get(coord, -1) != self.frame]
+        candidates.sort(key = lambda coord: (last_used.get(coord, -1), -abs(coord[0] - center_x) - abs(coord[1] - center_y)))
+        victims = candidates[:len(chunks) - int(self.max_chunks * self.low_water)]
+        for coord in victims:
+            last_used.pop(coord, None)
+        self.evicted += len(victims)
+        return victims
+
+def chunk_seed(seed, chunk_x, chunk_y):
+    # Every chunk gets its own seed derived from the world seed and its
+    # coordinates, so a chunk always comes out the same no matter when (or in
+    # which order) it is generated.
+    digest = hashlib.blake2b(f'{seed}:{chunk_x}:{chunk_y}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def tile_rolls(chunk_seeds, tiles):
+    # splitmix64 rolls for every tile of every chunk, shape (len(chunk_seeds), tiles)
+    z = np.asarray(chunk_seeds, dtype=np.uint64)[:, None] + np.arange(1, tiles + 1, dtype=np.uint64) * np.uint64(GOLDEN_GAMMA)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(MIX_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+def deposit_threshold(resource_probability):
+    return int(resource_probability * (1 << 24))
+
+def resource_band(chunk_x, chunk_y):
+    # Index into the resource mappings, rarer resources further from the portal
+    distance = abs(chunk_x)+abs(chunk_y)
+    if distance <= 2:
+        return 0
+    elif distance <= 4:
+        return 1
+    elif distance <= 6:
+        return 2
+    return 3
+
+# resource_mappings map a pick from 1 to 100 to a resource id, one mapping per distance band
+
+def generate_chunk(seed, chunk_x, chunk_y, chunk_size, resource_probability, resource_mappings):
+    return generate_chunks(seed, [(chunk_x, chunk_y)], chunk_size, resource_probability, resource_mappings)[(chunk_x, chunk_y)]
+
+def generate_chunks(seed, coords, chunk_size, resource_probability, resource_mappings):
+    # Generates a batch of chunks at once, returns {(chunk_x, chunk_y): chunk}
+    tiles = chunk_size * chunk_size
+    rolls = tile_rolls([chunk_seed(seed, x, y) for x, y in coords], tiles)
+
+    # Lookup table from (band, pick) to a resource id
+    lookup = np.zeros((len(resource_mappings), 101), dtype=np.uint8)
+    for band, mapping in enumerate(resource_mappings):
+        for pick, resource in mapping.items():
+            lookup[band, pick] = resource
+    bands = np.array([resource_band(x, y) for x, y in coords], dtype=np.intp)
+
+    # Seed mask, then the span and resource of every deposit in generation order
+    chunk_index, tile_index = np.nonzero(rolls & np.uint64(0xFFFFFF) < deposit_threshold(resource_probability))
+    deposits = rolls[chunk_index, tile_index]
+    span_x = 1 + ((deposits >> np.uint64(24) & np.uint64(0xFFF)) * np.uint64(MAX_SPAN) >> np.uint64(12)).astype(np.intp)
+    span_y = 1 + ((deposits >> np.uint64(36) & np.uint64(0xFFF)) * np.uint64(MAX_SPAN) >> np.uint64(12)).astype(np.intp)
+    resources = lookup[bands[chunk_index], 1 + ((deposits >> np.uint64(48)) * np.uint64(100) >> np.uint64(16)).astype(np.intp)]
+
+    # Deposits are clipped to the chunk they start in
+    local_x, local_y = tile_index // chunk_size, tile_index % chunk_size
+    width = np.minimum(span_x, chunk_size - local_x)
+    height = np.minimum(span_y, chunk_size - local_y)
+
+    chunks = [Chunk(x, y, chunk_size) for x, y in coords]
+    for i, x, y, w, h, resource in zip(chunk_index.tolist(), local_x.tolist(), local_y.tolist(), width.tolist(), height.tolist(), resources.tolist()):
+        chunk = chunks[i]
+        if len(chunk.deposits) < MAX_DEPOSITS:
+            chunk.deposits.append((chunk.x * chunk_size + x, chunk.y * chunk_size + y, w, h, resource))
+    return {(chunk.x, chunk.y): chunk for chunk in chunks}
+
+_worker_settings = None
+
+def _init_worker(*settings):
+    global _worker_settings
+    _worker_settings = settings
+
+def _generate_in_worker(coords):
+    seed, chunk_size, resource_probability, resource_mappings = _worker_settings
+    return generate_chunks(seed, coords, chunk_size, resource_probability, resource_mappings)
+
+class ChunkStreamer:
+    # Generates chunks on a pool of worker processes so the game loop never waits
+    # on world generation, finished chunks are picked up between frames
+
+    def __init__(self, seed, chunk_size, resource_probability, resource_mappings, workers = None, batch_size = 8):
+        self.settings = (seed, chunk_size, resource_probability, resource_mappings)
+        self.batch_size = batch_size
+        self.pending = set()
+        self.futures = {}
+        self.ready = {}
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)  # Leave a core for the game loop
+        try:
+            import multiprocessing
+            self.pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context = multiprocessing.get_context('spawn'),
+                                                               initializer = _init_worker, initargs = self.settings)
+        except (ImportError, NotImplementedError, OSError):
+            # No subprocesses (e.g. the web build), chunks are generated in the game loop instead
+            self.pool = None
+
+    def generate(self, coords):
+        seed, chunk_size, resource_probability, resource_mappings = self.settings
+        self.ready.update(generate_chunks(seed, coords, chunk_size, resource_probability, resource_mappings))
+
+    def request(self, coords):
+        # Queue chunks for generation, coords are handed to workers in the order given
+        coords = [coord for coord in coords if coord not in self.pending]
+        if not coords:
+            return
+        if self.pool is None:
+            self.generate(coords)
+            return
+        self.pending.update(coords)
+        for i in range(0, len(coords), self.batch_size):
+            batch = coords[i:i + self.batch_size]
+            self.futures[self.pool.submit(_generate_in_worker, batch)] = batch
+
+    def collect(self):
+        # Chunks finished since the last call, never blocks
+        for future in [future for future in self.futures if future.done()]:
+            batch = self.futures.pop(future)
+            try:
+                self.ready.update(future.result())
+            except concurrent.futures.process.BrokenProcessPool:
+                self.pool = None
+                self.generate(batch)
+            self.pending.difference_update(batch)
+        ready, self.ready = self.ready, {}
+        return ready
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures = True)
+            self.pool = None
+        self.futures = {}
+        self.pending = set()